@@ -2,7 +2,7 @@
 # import json
 # import time
 # import threading
-# from queue import Queue, Full, Empty
+# from queue import Full, Empty
 # from datetime import datetime
 
 # # Load configurations from config.json
@@ -116,7 +116,7 @@
 #         # Start a thread to add requests without blocking the GUI
 #         threading.Thread(target=add_requests, daemon=True).start()
 
-#     def update_display(self):
+#     def update_display(self, events=()):
 #         # Update queue display
 #         self.queue_display.delete(0, tk.END)
 #         for i, item in enumerate(list(self.server.queue.queue)):
@@ -151,24 +151,18 @@
 
 
 import tkinter as tk
-import json
 import time
-import threading
-from queue import Queue, Full, Empty
-from datetime import datetime
+from gui_widgets import InstrumentationControls, LogView, QueueView, RenderScheduler, StatsPanel
+from instrumentation import Instruments
+from server_simulator import ServerSimulator, queue_capacity
+from sim_config import load_config
 
 # Load configurations from config.json
-with open("config.json", "r") as file:
-    config = json.load(file)
-
-TIME_DELAY = config["rq_time_arrival"]
-QUEUE_LENGTH = config["queue_length"]
-PROCESS_TIMES = {
-    "read": config["read_time"],
-    "write": config["write_time"],
-    "forward": config["forward_time"]
-}
-REQUEST_SEQUENCE = config["requests_sequence"]
+config = load_config()
+QUEUE_CAPACITY = queue_capacity(config)  # Queue slots to draw
+
+FRAME_MS = config.get("frame_ms", 50)  # GUI frame interval; at most one repaint per frame
+INSTRUMENTATION = config.get("instrumentation")  # Opt-in timers, GUI overlay, stats dump and profilers, see instrumentation.py
 
 # Color mapping for request types
 REQUEST_COLORS = {
@@ -177,58 +171,9 @@ REQUEST_COLORS = {
     "forward": "blue"
 }
 
-# Server class simulating request processing with a limited queue
-class ServerSimulator:
-    def __init__(self, queue_length):
-        self.queue = Queue(maxsize=queue_length)
-        self.running = True
-        self.log = []
-        self.request_counts = {"read": 0, "write": 0, "forward": 0}  # Track request counts
-
-        # Start the processing thread
-        self.process_thread = threading.Thread(target=self.process_requests)
-        self.process_thread.start()
-
-    def add_request(self, request_type):
-        # Generate a unique name for the request, e.g., "Read1", "Write2", etc.
-        self.request_counts[request_type] += 1
-        request_name = f"{request_type.capitalize()}{self.request_counts[request_type]}"
-        
-        try:
-            self.queue.put_nowait(request_name)
-            self.log.append(f"[{datetime.now().strftime('%H:%M:%S')}] Request '{request_name}' added to the queue.")
-        except Full:
-            self.log.append(f"[{datetime.now().strftime('%H:%M:%S')}] Queue is full! Request '{request_name}' blocked.")
-
-    def process_requests(self):
-        while self.running:
-            try:
-                # Get the next request from the queue
-                request_name = self.queue.get(timeout=1)
-                
-                # Extract the request type (e.g., "Read" from "Read1")
-                request_type = ''.join(filter(str.isalpha, request_name)).lower()
-                
-                # Retrieve the processing time based on request type
-                process_time = PROCESS_TIMES.get(request_type, 1)
-                
-                self.log.append(f"[{datetime.now().strftime('%H:%M:%S')}] Processing '{request_name}' (time: {process_time}s)...")
-                
-                # Simulate request processing time
-                time.sleep(process_time)
-                self.log.append(f"[{datetime.now().strftime('%H:%M:%S')}] '{request_name}' processed.")
-                
-                self.queue.task_done()
-            except Empty:
-                continue
-
-    def stop(self):
-        self.running = False
-        self.process_thread.join()
-
 # Tkinter GUI Application
 class App(tk.Tk):
-    def __init__(self, server):
+    def __init__(self, server, instruments=None):
         super().__init__()
         self.title("Server Queue Simulation")
         self.geometry("1000x600")
@@ -237,11 +182,22 @@ class App(tk.Tk):
         # Create UI elements
         self.create_ui_elements()
 
-        # Automatically add requests from the sequence
-        self.process_sequence()
+        # One repaint per frame on the main thread, whenever the simulator has moved on
+        self.render_scheduler = RenderScheduler(self, self.update_display, FRAME_MS, instruments)
+        self.instrumentation = None
+        if instruments is not None:
+            self.instrumentation = InstrumentationControls(self, self.canvas, 500, 20, instruments,
+                                                           events=lambda: self.server.log.total,
+                                                           settings=INSTRUMENTATION)
+
+        # Play the configured arrival source (requests_sequence by default) on the simulator's virtual clock,
+        # advanced to the wall clock once per frame
+        self.server.start()
+        self.last_tick = time.perf_counter()
+        self.tick_job = self.after(FRAME_MS, self.tick)
 
         # Update queue and log display
-        self.update_display()
+        self.render_scheduler.start()
 
     def create_ui_elements(self):
         # Canvas to draw server and queue layout
@@ -255,11 +211,12 @@ class App(tk.Tk):
         # Queue Label
         self.canvas.create_text(400, 100, text="Request Queue", font=("Arial", 12))
 
-        # Compact Queue slots above Server
-        self.queue_slots = []
-        for i in range(QUEUE_LENGTH):
-            slot = self.canvas.create_rectangle(200 + i * 50, 130, 240 + i * 50, 170, outline="orange", fill="white")
-            self.queue_slots.append(slot)
+        # Live metrics panel
+        self.stats_panel = StatsPanel(self.canvas, 20, 220, self.server.metrics, clock=lambda: self.server.now,
+                                      admission=self.server.admission)
+
+        # Compact Queue slots above Server (an aggregated occupancy bar when they would not fit)
+        self.queue_view = QueueView(self.canvas, 200, 130, QUEUE_CAPACITY, REQUEST_COLORS, slot_size=40, pitch=50, max_width=780)
 
         # Status Log
         self.status_label = tk.Label(self, text="Status Log", font=("Arial", 12))
@@ -268,47 +225,39 @@ class App(tk.Tk):
         # Text widget to show the status log
         self.status_display = tk.Text(self, height=15, width=100, state="disabled")
         self.status_display.pack()
+        self.log_view = LogView(self.status_display, self.server.log, 20)  # Show last 20 log entries
+
+    def tick(self):
+        # Run the simulator up to the current time; repaint only if something happened
+        now = time.perf_counter()
+        if self.server.advance(now - self.last_tick):
+            self.render_scheduler.request()
+        self.last_tick = now
+        self.tick_job = self.after(FRAME_MS, self.tick)
+
+    def update_display(self, events=()):
+        # Update queue slots with colors based on request types; only changed slots are touched
+        self.queue_view.update([item.type for item in self.server.queued_items()])
+
+        # Latency, throughput and utilization so far
+        self.stats_panel.refresh()
 
-    def process_sequence(self):
-        # Add requests from REQUEST_SEQUENCE one by one with delay
-        def add_requests():
-            for request_type in REQUEST_SEQUENCE:
-                self.server.add_request(request_type)
-                self.update_display()
-                time.sleep(TIME_DELAY)  # Delay of TIME_DELAY seconds between each request
-
-        # Start a thread to add requests without blocking the GUI
-        threading.Thread(target=add_requests, daemon=True).start()
-
-    def update_display(self):
-        # Update queue slots with colors based on request types
-        queue_items = list(self.server.queue.queue)
-        for i in range(QUEUE_LENGTH):
-            if i < len(queue_items):
-                request_name = queue_items[i]
-                request_type = ''.join(filter(str.isalpha, request_name)).lower()
-                color = REQUEST_COLORS.get(request_type, "white")
-                self.canvas.itemconfig(self.queue_slots[i], fill=color)
-            else:
-                self.canvas.itemconfig(self.queue_slots[i], fill="white")
-
-        # Update log display
-        self.status_display.config(state="normal")
-        self.status_display.delete(1.0, tk.END)
-        self.status_display.insert(tk.END, "\n".join(self.server.log[-20:]))  # Show last 20 log entries
-        self.status_display.config(state="disabled")
-
-        # Schedule next update
-        self.after(1000, self.update_display)
+        # Update log display with only the entries added since the last tick
+        self.log_view.refresh()
 
     def on_closing(self):
+        self.after_cancel(self.tick_job)
+        self.render_scheduler.stop()
+        if self.instrumentation is not None:
+            self.instrumentation.stop()
         self.server.stop()
         self.destroy()
 
 # Main function
 def main():
-    server = ServerSimulator(QUEUE_LENGTH)
-    app = App(server)
+    instruments = Instruments() if INSTRUMENTATION is not None else None
+    server = ServerSimulator(config, instruments)
+    app = App(server, instruments)
     app.protocol("WM_DELETE_WINDOW", app.on_closing)
     app.mainloop()
 
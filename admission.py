@@ -0,0 +1,253 @@
+import random
+from collections import deque
+
+from event_log import FINISH, START
+
+# Admission control and backpressure beyond drop-on-full, configured by an "admission" section in config.json, e.g.
+#   "admission": {
+#       "client": "retry",                 # drop | block | retry: what the client does when a request is refused
+#       "timeout": 5,                      # block: give up after waiting this long for queue room (default: forever)
+#       "backoff_base": 0.5, "backoff_cap": 30, "max_retries": 4, "jitter": "full",   # retry
+#       "limiter": "token_bucket",         # none | token_bucket | red: refuse requests before the queue is full
+#       "token_rates": {"write": 0.5}, "token_burst": {"write": 2},                    # token_bucket, per type
+#       "red_min": 0.5, "red_max": 1.0, "red_max_p": 0.2, "red_weight": 0.2,           # red, fractions of the bound
+#       "deadline": 20,                    # completions slower than this, end to end, do not count as goodput
+#       "seed": 1
+#   }
+# The limiter runs inside the server (QueueSimulation or the asyncio simulator); the client policy
+# wraps add_request (AdmissionClient, also behind the demos' ServerSimulator). Every policy reports retry amplification (attempts per offered request) and goodput.
+
+CLIENTS = ("drop", "block", "retry")
+LIMITERS = ("none", "token_bucket", "red")
+JITTERS = ("full", "equal", "none")
+
+
+# Per-type token buckets: a request of a limited type needs a token, refilled at `rate` per second up to `burst`
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "last")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = None
+
+    def take(self, now):
+        if self.last is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class TokenBucketLimiter:
+    def __init__(self, rates, burst=None):
+        burst = burst if isinstance(burst, dict) else {request_type: burst for request_type in rates}
+        self.buckets = {request_type: TokenBucket(rate, burst.get(request_type) or max(1.0, rate))
+                        for request_type, rate in rates.items()}
+
+    def admit(self, now, request_type, depth, bound):
+        bucket = self.buckets.get(request_type)
+        return bucket is None or bucket.take(now)
+
+
+# RED-style early drop: refuse with a probability rising linearly from 0 to max_p as the averaged queue depth
+# goes from min_fraction to max_fraction of the bound, and always above it.
+# The average is an exponentially weighted moving average sampled at each arrival, kept per request type
+# so that partitioned queues are averaged separately (with a shared bound every type sees the same depth).
+class EarlyDropLimiter:
+    def __init__(self, min_fraction=0.5, max_fraction=1.0, max_p=0.1, weight=0.2, seed=None):
+        self.min_fraction = min_fraction
+        self.max_fraction = max_fraction
+        self.max_p = max_p
+        self.weight = weight
+        self.average = {}
+        self.rng = random.Random(seed)
+
+    def admit(self, now, request_type, depth, bound):
+        average = self.average.get(request_type, depth)
+        average += self.weight * (depth - average)
+        self.average[request_type] = average
+        low = self.min_fraction * bound
+        high = self.max_fraction * bound
+        if average < low:
+            return True
+        if average >= high:
+            return False
+        return self.rng.random() >= self.max_p * (average - low) / (high - low)
+
+
+# Capped exponential backoff: the n-th retry waits up to min(cap, base * 2**n), jittered
+class Backoff:
+    def __init__(self, base=0.5, cap=30.0, max_retries=5, jitter="full", seed=None):
+        if jitter not in JITTERS:
+            raise ValueError(f"Unknown jitter: {jitter} (expected one of {', '.join(JITTERS)})")
+        self.base = base
+        self.cap = cap
+        self.max_retries = max_retries
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+
+    def delay(self, retries):
+        # Delay before retry number retries + 1, or None once the retries are used up
+        if retries >= self.max_retries:
+            return None
+        ceiling = min(self.cap, self.base * 2 ** retries)
+        if self.jitter == "full":
+            return self.rng.uniform(0, ceiling)
+        if self.jitter == "equal":
+            return ceiling / 2 + self.rng.uniform(0, ceiling / 2)
+        return ceiling
+
+
+# Client-side accounting for AdmissionClient
+class AdmissionStats:
+    def __init__(self, deadline=None):
+        self.deadline = deadline
+        self.offered = 0  # Distinct client requests
+        self.attempts = 0  # Submissions to the server, retries included
+        self.gave_up = 0  # Requests refused after the last retry, or timed out waiting for queue room
+        self.completed = 0
+        self.good = 0  # Completions within the deadline, measured from the first attempt
+
+    def on_offer(self):
+        self.offered += 1
+
+    def on_attempt(self):
+        self.attempts += 1
+
+    def on_give_up(self):
+        self.gave_up += 1
+
+    def on_complete(self, latency):
+        self.completed += 1
+        if self.deadline is None or latency <= self.deadline:
+            self.good += 1
+
+    def snapshot(self, elapsed):
+        return {
+            "offered": self.offered,
+            "attempts": self.attempts,
+            "retry_amplification": self.attempts / self.offered if self.offered else 0.0,
+            "gave_up": self.gave_up,
+            "completed": self.completed,
+            "good": self.good,
+            "goodput": self.good / elapsed if elapsed > 0 else 0.0,
+            "good_fraction": self.good / self.offered if self.offered else 0.0
+        }
+
+
+# One-line rendering of an admission snapshot, for the headless summary and the GUI stats panel
+def format_admission(snapshot):
+    return (f"goodput {snapshot['goodput']:.3f}/s ({snapshot['good_fraction']:.1%} of offered)  "
+            f"amplification {snapshot['retry_amplification']:.2f}x  gave up {snapshot['gave_up']}")
+
+
+# Client policy for a QueueSimulation: arrivals go through add_request here instead of the simulation's.
+# drop submits once; retry resubmits refused requests after a backoff; block waits (up to timeout) for queue
+# room before submitting, so the queue bound pushes back on the client instead of dropping.
+class AdmissionClient:
+    def __init__(self, simulation, mode="drop", timeout=None, backoff=None, deadline=None):
+        if mode not in CLIENTS:
+            raise ValueError(f"Unknown admission client: {mode} (expected one of {', '.join(CLIENTS)})")
+        self.simulation = simulation
+        self.mode = mode
+        self.timeout = timeout
+        self.backoff = backoff if mode == "retry" else None
+        self.stats = AdmissionStats(deadline)
+        self.origins = {}  # (request_type, request_id) -> first attempt time, for requests inside the simulation
+        self.waiting = deque()  # Blocked submissions as [request_type, first attempt time, still waiting, timeout event]
+        self.blocked_clients = 0  # Entries of `waiting` still waiting
+        self.wake_pending = False
+        simulation.admission = self
+        simulation.listeners.append(self._listener)
+
+    def add_request(self, request_type):
+        self.stats.on_offer()
+        self._attempt(request_type, self.simulation.engine.now, 0)
+
+    def _attempt(self, request_type, first_time, retries):
+        self.stats.on_attempt()
+        if self.mode == "block" and (self.blocked_clients or not self.simulation.has_room(request_type)):
+            entry = [request_type, first_time, True, None]
+            self.waiting.append(entry)
+            self.blocked_clients += 1
+            if self.timeout is not None:
+                entry[3] = self.simulation.engine.schedule(self.timeout, self._expire, entry)
+            return
+        self._submit(request_type, first_time, retries)
+
+    def _submit(self, request_type, first_time, retries):
+        simulation = self.simulation
+        blocked = simulation.blocked
+        simulation.add_request(request_type)
+        if simulation.blocked == blocked:
+            self.origins[(request_type, simulation.request_counts[request_type])] = first_time
+            return
+        delay = self.backoff.delay(retries) if self.backoff is not None else None
+        if delay is None:
+            self.stats.on_give_up()
+        else:
+            simulation.engine.schedule(delay, self._attempt, request_type, first_time, retries + 1)
+
+    def _expire(self, entry):
+        if entry[2]:
+            entry[2] = False
+            self.blocked_clients -= 1
+            self.stats.on_give_up()
+
+    def _wake(self):
+        # Submit blocked requests, oldest first, while their queues have room
+        self.wake_pending = False
+        for entry in self.waiting:
+            if entry[2] and self.simulation.has_room(entry[0]):
+                entry[2] = False
+                self.blocked_clients -= 1
+                if entry[3] is not None:
+                    self.simulation.engine.cancel(entry[3])
+                self._submit(entry[0], entry[1], 0)
+        self.waiting = deque(entry for entry in self.waiting if entry[2])
+
+    def _listener(self, kind, now, request_id, request_type):
+        if kind == FINISH:
+            first_time = self.origins.pop((request_type, request_id), None)
+            if first_time is not None:
+                self.stats.on_complete(now - first_time)
+        elif kind == START and self.blocked_clients and not self.wake_pending:
+            # A queue slot was freed; submit from a separate event so the simulation is not re-entered mid-start
+            self.wake_pending = True
+            self.simulation.engine.schedule(0, self._wake)
+
+    def snapshot(self):
+        return self.stats.snapshot(self.simulation.engine.now)
+
+
+def limiter_from_config(config):
+    spec = config.get("admission") or {}
+    kind = spec.get("limiter", "none")
+    if kind not in LIMITERS:
+        raise ValueError(f"Unknown admission limiter: {kind} (expected one of {', '.join(LIMITERS)})")
+    if kind == "token_bucket":
+        return TokenBucketLimiter(spec.get("token_rates", {}), spec.get("token_burst"))
+    if kind == "red":
+        return EarlyDropLimiter(spec.get("red_min", 0.5), spec.get("red_max", 1.0), spec.get("red_max_p", 0.1),
+                                spec.get("red_weight", 0.2), spec.get("seed"))
+    return None
+
+
+def backoff_from_config(config):
+    spec = config.get("admission") or {}
+    return Backoff(spec.get("backoff_base", 0.5), spec.get("backoff_cap", 30.0), spec.get("max_retries", 5),
+                   spec.get("jitter", "full"), spec.get("seed"))
+
+
+# The configured client for a simulation, or None without an "admission" section
+def client_from_config(simulation, config):
+    spec = config.get("admission")
+    if not spec:
+        return None
+    return AdmissionClient(simulation, spec.get("client", "drop"), spec.get("timeout"), backoff_from_config(config),
+                           spec.get("deadline"))
+
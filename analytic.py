@@ -0,0 +1,195 @@
+import argparse
+import json
+
+from arrivals import poisson_parameters, poisson_version
+from event_engine import run_scenario
+from sim_config import DEFAULT_CONFIG_PATH, load_config, process_times
+
+try:
+    import numpy as np
+except ImportError:  # Only the analytic models need NumPy
+    np = None
+
+# Closed-form and numerically exact queueing models for config.json scenarios. All functions accept
+# NumPy arrays and broadcast, so a whole parameter grid is solved in one call. `capacity` is the
+# total number of requests the system holds: queue_length waiting plus one per worker.
+#
+# A scenario maps onto M/G/1/K exactly when arrivals are Poisson ("arrivals": {"kind": "poisson"}),
+# there is a single worker and the queue is FIFO: the service time is then the per-type mix of
+# PROCESS_TIMES. M/M/c/K is provided for exponential-service what-if studies.
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("analytic needs NumPy: pip install numpy")
+
+
+# Blocking, utilization, mean queue lengths and waits from the stationary distribution p[..., n]
+def _measures(arrival_rate, p, servers, capacity):
+    n = np.arange(p.shape[-1])
+    block = np.take_along_axis(p, np.asarray(capacity)[..., None], axis=-1)[..., 0]
+    mean_in_system = (p * n).sum(axis=-1)
+    mean_queue = (p * np.maximum(n - np.asarray(servers)[..., None], 0)).sum(axis=-1)
+    throughput = arrival_rate * (1 - block)
+    return {
+        "block_rate": block,
+        "throughput": throughput,
+        "utilization": (mean_in_system - mean_queue) / servers,
+        "mean_in_system": mean_in_system,
+        "mean_queue_length": mean_queue,
+        "mean_wait": mean_queue / throughput,
+        "mean_sojourn": mean_in_system / throughput
+    }
+
+
+# M/M/c/K: Poisson arrivals, exponential service at rate service_rate per worker, c workers
+def mmck(arrival_rate, service_rate, servers, capacity):
+    _require_numpy()
+    arrival_rate, service_rate, servers, capacity = np.broadcast_arrays(
+        np.asarray(arrival_rate, dtype=float), np.asarray(service_rate, dtype=float),
+        np.asarray(servers, dtype=np.int64), np.asarray(capacity, dtype=np.int64))
+    if np.any(capacity < servers):
+        raise ValueError("capacity must be at least the number of servers")
+    n = np.arange(int(capacity.max()) + 1)
+    log_factorial = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, n[-1] + 1)))))
+    offered = (arrival_rate / service_rate)[..., None]
+    c = servers[..., None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # log p_n (unnormalised): a^n / n! below c workers, a^c / c! * (a / c)^(n - c) above
+        busy = np.minimum(n, c)
+        log_p = busy * np.log(offered) - log_factorial[busy] + (n - busy) * np.log(offered / c)
+    log_p = np.where(n <= capacity[..., None], log_p, -np.inf)
+    log_p = np.where(np.isnan(log_p), np.where(n == 0, 0.0, -np.inf), log_p)  # Zero load: empty system
+    p = np.exp(log_p - log_p.max(axis=-1, keepdims=True))
+    p /= p.sum(axis=-1, keepdims=True)
+    return _measures(arrival_rate, p, servers, capacity)
+
+
+# M/M/1/K
+def mm1k(arrival_rate, service_rate, capacity):
+    return mmck(arrival_rate, service_rate, 1, capacity)
+
+
+# M/G/1/K with a discrete service-time distribution (values[..., j] with probabilities[..., j]),
+# solved exactly through the Markov chain embedded at departures. `capacity` is a single integer;
+# every other argument may carry leading grid dimensions.
+def mg1k(arrival_rate, values, probabilities, capacity):
+    _require_numpy()
+    arrival_rate = np.asarray(arrival_rate, dtype=float)
+    values = np.asarray(values, dtype=float)
+    probabilities = np.asarray(probabilities, dtype=float)
+    grid = np.broadcast_shapes(arrival_rate.shape, values.shape[:-1], probabilities.shape[:-1])
+    arrival_rate = np.broadcast_to(arrival_rate, grid)
+    values = np.broadcast_to(values, grid + values.shape[-1:])
+    probabilities = np.broadcast_to(probabilities, grid + values.shape[-1:])
+    size = capacity  # Embedded chain states: 0 .. capacity - 1 requests left behind by a departure
+
+    # a[k]: probability of k arrivals during one service (Poisson mixture over the service values)
+    k = np.arange(size)
+    log_factorial = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, max(size, 1))))))[:size]
+    load = arrival_rate[..., None] * values
+    with np.errstate(divide="ignore"):
+        log_poisson = k * np.log(load[..., None]) - load[..., None] - log_factorial
+    a = (probabilities[..., None] * np.exp(log_poisson)).sum(axis=-2)
+
+    # Transition matrix: from i (>= 1) the next departure leaves i - 1 + arrivals, truncated at size - 1
+    rows = np.arange(size)[:, None]
+    steps = k[None, :] - np.maximum(rows - 1, 0)
+    transition = np.where(steps >= 0, a[..., np.clip(steps, 0, size - 1)], 0.0)
+    transition[..., -1] = 1.0 - transition[..., :-1].sum(axis=-1)
+
+    # Solve pi (P - I) = 0 with sum(pi) = 1
+    system = np.swapaxes(transition, -1, -2) - np.eye(size)
+    system[..., -1, :] = 1.0
+    target = np.zeros(grid + (size, 1))
+    target[..., -1, 0] = 1.0
+    pi = np.linalg.solve(system, target)[..., 0]
+
+    mean_service = (values * probabilities).sum(axis=-1)
+    rho = arrival_rate * mean_service
+    scale = pi[..., 0] + rho
+    p = np.concatenate((pi / scale[..., None], (1.0 - 1.0 / scale)[..., None]), axis=-1)
+    return _measures(arrival_rate, p, 1, np.full(grid, capacity))
+
+
+# Whether a scenario is an exact M/G/1/K instance
+def applies(config):
+    spec = config.get("arrivals") or {}
+    return (spec.get("kind") == "poisson" and config.get("workers", 1) == 1 and not config.get("worker_groups")
+            and config.get("discipline", "fifo") == "fifo" and config["queue_length"] >= 1
+            and not config.get("admission"))
+
+
+# Arrival rate and service-time distribution of a Poisson scenario
+def scenario_parameters(config):
+    rate, mix = poisson_parameters(config)
+    times = process_times(config)
+    total = sum(mix.values())
+    values = [times.get(request_type, 1) for request_type in mix]
+    probabilities = [weight / total for weight in mix.values()]
+    return rate, values, probabilities
+
+
+# Analytic answer for one scenario (plain floats), or None when no exact model applies
+def solve_config(config):
+    if not applies(config):
+        return None
+    rate, values, probabilities = scenario_parameters(config)
+    result = mg1k(rate, values, probabilities, config["queue_length"] + 1)
+    return {name: float(value) for name, value in result.items()}
+
+
+# Solve many scenarios at once, batching those with the same capacity into one mg1k call.
+# Returns one result dict (or None) per config, in order.
+def solve_configs(configs):
+    _require_numpy()
+    results = [None] * len(configs)
+    groups = {}
+    for position, config in enumerate(configs):
+        if applies(config):
+            rate, values, probabilities = scenario_parameters(config)
+            groups.setdefault((config["queue_length"] + 1, len(values)), []).append((position, rate, values, probabilities))
+    for (capacity, _), members in groups.items():
+        positions, rates, values, probabilities = zip(*members)
+        solved = mg1k(np.array(rates), np.array(values), np.array(probabilities), capacity)
+        for i, position in enumerate(positions):
+            results[position] = {name: float(value[i]) for name, value in solved.items()}
+    return results
+
+
+# Oracle check: simulate a Poisson scenario on the event engine and compare with the exact model
+def validate(config, requests=200000, seed=0):
+    if not applies(config):
+        raise ValueError("scenario is not an M/G/1/K instance (needs Poisson arrivals, one worker, FIFO)")
+    expected = solve_config(config)
+    config = dict(config, arrivals=dict(config["arrivals"], count=requests, seed=seed))
+    simulation = run_scenario(config, collect_metrics=True)
+    snapshot = simulation.metrics.snapshot(simulation.engine.now)
+    simulated = {name: snapshot[name] for name in ("block_rate", "throughput", "utilization", "mean_queue_length")}
+    simulated["mean_wait"] = snapshot["mean_wait"]
+    return {name: {"analytic": expected[name], "simulated": value} for name, value in simulated.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exact queueing-model answers for a config.json scenario.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH)
+    parser.add_argument("--poisson", action="store_true",
+                        help="treat the config's arrivals as Poisson at 1 / rq_time_arrival with the requests_sequence mix")
+    parser.add_argument("--validate", type=int, default=0, metavar="N", help="also simulate N arrivals and compare")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    config = load_config(args.config)
+    if args.poisson:
+        config = poisson_version(config)
+
+    result = solve_config(config)
+    if result is None:
+        parser.exit(1, "No exact model applies: needs Poisson arrivals (see --poisson), one worker and FIFO.\n")
+    output = {"model": "M/G/1/K", "result": result}
+    if args.validate:
+        output["validation"] = validate(config, args.validate, args.seed)
+    print(json.dumps(output, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import csv
+import json
+import random
+from bisect import bisect
+from collections import Counter
+from itertools import accumulate
+
+# Arrival sources: generators yielding (time, request_type) in non-decreasing time order.
+# They are consumed lazily by QueueSimulation.feed, so memory stays constant however long the stream is.
+
+DEFAULT_MIX = {"read": 1, "write": 1, "forward": 1}  # Request mix of generated arrivals without a configured one
+
+
+# Arrivals of the config's requests_sequence: one request every rq_time_arrival seconds
+def sequence_arrivals(sequence, time_delay):
+    for i, request_type in enumerate(sequence):
+        yield i * time_delay, request_type
+
+
+# Build a request-type picker from mix weights, e.g. {"read": 3, "write": 1, "forward": 1}
+def type_picker(mix, rng):
+    types = list(mix)
+    cumulative = list(accumulate(mix[request_type] for request_type in types))
+    total = cumulative[-1]
+    return lambda: types[bisect(cumulative, rng.random() * total)]
+
+
+# Poisson arrivals at `rate` requests per second, stopping after `count` requests or at time `duration`
+def poisson_arrivals(rate, mix, count=None, duration=None, seed=None):
+    rng = random.Random(seed)
+    pick = type_picker(mix, rng)
+    now = 0.0
+    emitted = 0
+    while count is None or emitted < count:
+        now += rng.expovariate(rate)
+        if duration is not None and now > duration:
+            return
+        yield now, pick()
+        emitted += 1
+
+
+# Bursty arrivals from a Markov-modulated Poisson process: the source stays in state i for an
+# exponential time with mean `holding_times[i]`, emitting at `rates[i]`, then moves to the next state
+def mmpp_arrivals(rates, holding_times, mix, count=None, duration=None, seed=None):
+    if len(rates) != len(holding_times):
+        raise ValueError("rates and holding_times must have one entry per state")
+    rng = random.Random(seed)
+    pick = type_picker(mix, rng)
+    state = 0
+    now = 0.0
+    state_end = rng.expovariate(1.0 / holding_times[state])
+    emitted = 0
+    while count is None or emitted < count:
+        rate = rates[state]
+        gap = rng.expovariate(rate) if rate > 0 else float("inf")
+        if now + gap > state_end:
+            # Memoryless: discard the partial gap and restart the clock in the next state
+            now = state_end
+            state = (state + 1) % len(rates)
+            state_end = now + rng.expovariate(1.0 / holding_times[state])
+            continue
+        now += gap
+        if duration is not None and now > duration:
+            return
+        yield now, pick()
+        emitted += 1
+
+
+# Stream a recorded trace: JSON lines {"time": 1.5, "type": "read"} or a CSV file with time,type columns
+def trace_arrivals(path):
+    last = float("-inf")
+    with open(path, "r", newline="") as file:
+        if path.endswith(".csv"):
+            rows = ((row["time"], row["type"]) for row in csv.DictReader(file))
+        else:
+            rows = ((entry["time"], entry["type"]) for entry in map(json.loads, filter(str.strip, file)))
+        for when, request_type in rows:
+            when = float(when)
+            if when < last:
+                raise ValueError(f"Trace {path} is not sorted by time ({when} after {last})")
+            last = when
+            yield when, request_type.lower()
+
+
+# Rate and request mix of a scenario with Poisson arrivals, as arrivals_from_config generates them.
+# The models that assume Poisson arrivals (analytic.py, batch_engine.py) resolve them here too.
+def poisson_parameters(config):
+    spec = config.get("arrivals") or {}
+    kind = spec.get("kind", "sequence")
+    if kind != "poisson":
+        raise ValueError(f"Arrival source is {kind}, not poisson")
+    return spec.get("rate", 1.0 / config["rq_time_arrival"]), spec.get("mix", DEFAULT_MIX)
+
+
+# The stochastic version of a requests_sequence scenario: Poisson arrivals at 1 / rq_time_arrival with the
+# sequence's request-type frequencies. Configs with an "arrivals" section are returned unchanged.
+def poisson_version(config):
+    if config.get("arrivals"):
+        return config
+    return dict(config, arrivals={"kind": "poisson", "mix": dict(Counter(config["requests_sequence"]))})
+
+
+# Pick the arrival source for a scenario: the optional "arrivals" section of config.json, or requests_sequence.
+# Generated sources (poisson, mmpp) run forever without a count or duration, which only a GUI playback wants:
+# runs that must end (the batch entry points) pass bounded=True to have such a source rejected.
+def arrivals_from_config(config, bounded=False):
+    spec = config.get("arrivals")
+    if not spec:
+        return sequence_arrivals(config["requests_sequence"], config["rq_time_arrival"])
+    kind = spec["kind"]
+    mix = spec.get("mix", DEFAULT_MIX)
+    limits = {"count": spec.get("count"), "duration": spec.get("duration"), "seed": spec.get("seed")}
+    if bounded and kind in ("poisson", "mmpp") and limits["count"] is None and limits["duration"] is None:
+        raise ValueError(f"{kind} arrivals never end without a \"count\" or \"duration\" in the arrivals section")
+    if kind == "poisson":
+        return poisson_arrivals(*poisson_parameters(config), **limits)
+    if kind == "mmpp":
+        return mmpp_arrivals(spec["rates"], spec["holding_times"], mix, **limits)
+    if kind == "trace":
+        return trace_arrivals(spec["path"])
+    if kind == "sequence":
+        return sequence_arrivals(config["requests_sequence"], config["rq_time_arrival"])
+    raise ValueError(f"Unknown arrival source kind: {kind}")
@@ -0,0 +1,338 @@
+import asyncio
+import random
+import selectors
+import threading
+
+from admission import limiter_from_config
+from arrivals import type_picker
+from event_log import BLOCK, ENQUEUE, FINISH, START, EventLog, request_name
+from metrics import MetricsCollector, ThreadSafeMetricsCollector
+from request import Request, type_codes
+from scheduling import make_queue, scheduling_options
+from sim_config import process_times
+from trace_file import TraceWriter
+
+# asyncio client/queue/server pipeline: every simulated client is a coroutine that thinks, sends a request and
+# waits for the response, so tens of thousands of independent clients run in one thread without a thread each.
+# Time is either virtual (VirtualClockLoop jumps straight to the next timer, as fast as possible) or the wall
+# clock scaled by `speed`. Configured by a "clients" section in config.json, e.g.
+#   "clients": {
+#       "count": 10000,
+#       "duration": 600,
+#       "profiles": [
+#           {"weight": 3, "think_time": 20, "mix": {"read": 8, "write": 1, "forward": 1}},
+#           {"weight": 1, "think_time": 5, "mix": {"write": 1}}
+#       ],
+#       "seed": 1
+#   }
+# Each client takes a profile at random (by weight) and draws exponential think times around its mean.
+# Without profiles the clients together offer the configured arrival rate (think_time = count * rq_time_arrival)
+# with an even request mix. A refused request is dropped; the client thinks and tries its next request.
+# Settings only the event engine models (worker_groups, queue_partitions, the block and retry admission clients)
+# are rejected rather than ignored.
+
+
+# Selector that never sleeps: with nothing ready it advances the loop's virtual clock by the timeout instead
+class _VirtualTimeSelector(selectors.DefaultSelector):
+    def __init__(self):
+        super().__init__()
+        self.now = 0.0
+
+    def select(self, timeout=None):
+        # No timers at all means everything waits on another thread, which only the real select can notice
+        events = super().select(None if timeout is None else 0)
+        if not events and timeout:
+            self.now += timeout
+        return events
+
+
+# Event loop on a virtual clock: asyncio.sleep and call_later complete in timer order without waiting
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    def __init__(self):
+        self._virtual_selector = _VirtualTimeSelector()
+        super().__init__(self._virtual_selector)
+
+    def time(self):
+        return self._virtual_selector.now
+
+
+# asyncio.Queue whose storage follows a scheduling discipline (see scheduling.make_queue)
+class AsyncSchedulingQueue(asyncio.Queue):
+    def __init__(self, maxsize=0, discipline="fifo", process_times=None, priorities=None, weights=None):
+        self.scheduling = (discipline, process_times, priorities, weights)
+        super().__init__(maxsize)
+
+    def _init(self, maxsize):
+        self._queue = make_queue(*self.scheduling)
+
+    @property
+    def queue(self):
+        # The underlying storage, named like queue.Queue's for display code
+        return self._queue
+
+
+# A queued request and the future its client awaits
+class _PendingRequest(Request):
+    __slots__ = ("done",)
+
+    def __init__(self, request_id, code, arrival, done):
+        super().__init__(request_id, code, arrival)
+        self.done = done
+
+
+# Coroutine counterpart of QueueSimulation: same bounded queue, counters, listeners, log and metrics hooks
+class AsyncSimulation:
+    def __init__(self, queue_length, process_times, workers=1, speed=None, log=None, metrics=None,
+                 scheduling=None, limiter=None):
+        self.queue_length = queue_length
+        self.process_times = process_times
+        self.workers = workers
+        self.speed = speed  # None: virtual time; otherwise simulated seconds per wall-clock second
+        self.scheduling = scheduling or {}
+        self.log = log  # Optional EventLog
+        self.metrics = metrics  # Optional MetricsCollector
+        self.limiter = limiter  # Optional admission limiter, as in QueueSimulation
+        self.admission = None
+        self.request_counts = {request_type: 0 for request_type in process_times}
+        self.type_codes = type_codes(process_times)
+        self.listeners = []  # Callables notified as listener(kind, time, request_id, request_type)
+        self.update_queue_display_callback = None  # GUI hook, called like ServerSimulator's
+        self.loop = None
+        self.queue = None
+        self.worker_tasks = []
+        self.origin = 0.0
+        self.clients = 0
+        self.queued = 0
+        self.busy = 0
+        self.arrived = 0
+        self.blocked = 0
+        self.shed = 0
+        self.completed = 0
+
+    def now(self):
+        # Simulated time since the start of the run
+        return (self.loop.time() - self.origin) * (self.speed or 1.0)
+
+    def sleep(self, seconds):
+        return asyncio.sleep(seconds / self.speed if self.speed else seconds)
+
+    async def request(self, request_type):
+        # Submit one request and wait for its response; False if it was refused
+        self.request_counts[request_type] += 1
+        request_id = self.request_counts[request_type]
+        self.arrived += 1
+        now = self.now()
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.on_arrival(now, request_type)
+        queue = self.queue
+        depth = queue.qsize()
+        shed = depth < self.queue_length and self.limiter is not None and \
+            not self.limiter.admit(now, request_type, depth, self.queue_length)
+        if depth >= self.queue_length or shed:
+            self.blocked += 1
+            if metrics is not None:
+                metrics.on_block(now, request_type)
+            if shed:
+                self.shed += 1
+            self._emit(BLOCK, request_id, request_type, now, "shed" if shed else None)
+            return False
+        done = self.loop.create_future()
+        queue.put_nowait(_PendingRequest(request_id, self.type_codes[request_type], now, done))
+        self.queued += 1
+        if metrics is not None:
+            metrics.on_enqueue(now, request_type)
+        self._emit(ENQUEUE, request_id, request_type, now)
+        await done
+        return True
+
+    async def worker(self):
+        queue = self.queue
+        while True:
+            request = await queue.get()
+            request_type = request.type
+            self.queued -= 1
+            self.busy += 1
+            now = request.start = self.now()
+            process_time = self.process_times.get(request_type, 1)
+            if self.metrics is not None:
+                self.metrics.on_start(now, request_type, now - request.arrival)
+            self._emit(START, request.id, request_type, now, process_time)
+            await self.sleep(process_time)
+            now = request.finish = self.now()
+            self.busy -= 1
+            self.completed += 1
+            if self.metrics is not None:
+                self.metrics.on_finish(now, request_type, now - request.arrival)
+            self._emit(FINISH, request.id, request_type, now)
+            if not request.done.done():  # Cancelled when its client went away (e.g. a closed loopback connection)
+                request.done.set_result(None)
+
+    async def client(self, think_time, pick, rng, until):
+        while True:
+            await self.sleep(rng.expovariate(1.0 / think_time))
+            if self.now() >= until:
+                return
+            await self.request(pick())
+
+    def _emit(self, kind, request_id, request_type, now, detail=None):
+        if self.log is not None:
+            self.log.append(kind, request_id, request_type, now, detail)
+        for listener in self.listeners:
+            listener(kind, now, request_id, request_type)
+        callback = self.update_queue_display_callback
+        if callback is not None:
+            if kind == BLOCK:
+                callback(request_name(request_type, request_id), request_type, blocked=True)
+            else:
+                callback()
+
+    def start(self):
+        # Bind to the running loop and start the workers; request() can be awaited from then on
+        self.loop = asyncio.get_running_loop()
+        self.origin = self.loop.time()
+        self.queue = AsyncSchedulingQueue(0, **self.scheduling)  # Bounded by request(), like QueueSimulation
+        self.worker_tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self.worker_tasks, return_exceptions=True)
+
+    async def run(self, profiles, count, duration, seed=None):
+        # Start the workers and `count` clients, let them run for `duration` simulated seconds, then stop them
+        self.start()
+        rng = random.Random(seed)
+        weights = [profile.get("weight", 1) for profile in profiles]
+        pickers = [type_picker(profile["mix"], rng) for profile in profiles]
+        clients = []
+        for index in rng.choices(range(len(profiles)), weights, k=count):
+            clients.append(asyncio.create_task(self.client(profiles[index]["think_time"], pickers[index], rng,
+                                                           duration)))
+        self.clients = count
+        try:
+            await self.sleep(duration)
+        finally:
+            for task in clients:
+                task.cancel()
+            await asyncio.gather(*clients, return_exceptions=True)
+            await self.stop()
+        return self
+
+    def queued_items(self):
+        # Waiting requests, for display
+        return list(self.queue.queue) if self.queue is not None else []
+
+    def total_workers(self):
+        return self.workers
+
+    def summary(self):
+        return {
+            "sim_time": self.now() if self.loop is not None else 0.0,
+            "clients": self.clients,
+            "arrived": self.arrived,
+            "accepted": self.arrived - self.blocked,
+            "blocked": self.blocked,
+            "shed": self.shed,
+            "completed": self.completed,
+            "block_rate": self.blocked / self.arrived if self.arrived else 0.0
+        }
+
+
+# Client profiles, count and duration from the "clients" section, with `count` and `duration` overrides
+def client_settings(config, count=None, duration=None):
+    spec = config.get("clients") or {}
+    times = process_times(config)
+    count = count or spec.get("count", 1000)
+    profiles = spec.get("profiles") or [{"think_time": count * config["rq_time_arrival"],
+                                         "mix": dict.fromkeys(times, 1)}]
+    return profiles, count, duration or spec.get("duration", 600.0), spec.get("seed")
+
+
+def simulation_from_config(config, speed=None, log=None, thread_safe=False):
+    if config.get("worker_groups") or config.get("queue_partitions"):
+        raise ValueError("async_sim models one shared worker pool; use the event engine for worker_groups and "
+                         "queue_partitions")
+    if (config.get("admission") or {}).get("client", "drop") != "drop":
+        raise ValueError("async_sim clients drop refused requests; use the event engine for the block and retry "
+                         "admission clients")
+    times = process_times(config)
+    collector = ThreadSafeMetricsCollector if thread_safe else MetricsCollector
+    return AsyncSimulation(config["queue_length"], times, config.get("workers", 1), speed, log,
+                           collector(times, servers=config.get("workers", 1)),
+                           scheduling_options(config, times), limiter_from_config(config))
+
+
+# Run the client population to completion on the virtual clock (speed=None) or in scaled real time
+def run_async(config, count=None, duration=None, speed=None, log_capacity=0, trace_path=None):
+    log = EventLog(log_capacity, virtual_time=True) if log_capacity else None
+    simulation = simulation_from_config(config, speed, log)
+    trace = TraceWriter(trace_path, simulation) if trace_path else None
+    if trace is not None:
+        simulation.listeners.append(trace)
+    loop = VirtualClockLoop() if speed is None else asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(simulation.run(*client_settings(config, count, duration)))
+    finally:
+        loop.close()
+        if trace is not None:
+            trace.close()
+    return simulation
+
+
+# The same simulation on a background thread in (scaled) real time, for the Tk GUI:
+# exposes the ServerSimulator surface the App uses (log, metrics, queued_items, callback, stop)
+class AsyncSimulationThread:
+    def __init__(self, config, count=None, duration=None, speed=1.0, log_capacity=1000):
+        self.attach(simulation_from_config(config, speed, EventLog(log_capacity, virtual_time=True), thread_safe=True))
+        self.settings = client_settings(config, count, duration)
+
+    def attach(self, simulation):
+        self.simulation = simulation
+        self.log = self.simulation.log
+        self.metrics = self.simulation.metrics
+        self.admission = None
+        self.loop = asyncio.new_event_loop()
+        self.task = None
+        self.thread = None
+
+    @property
+    def update_queue_display_callback(self):
+        return self.simulation.update_queue_display_callback
+
+    @update_queue_display_callback.setter
+    def update_queue_display_callback(self, callback):
+        self.simulation.update_queue_display_callback = callback
+
+    @property
+    def now(self):
+        return self.simulation.now() if self.simulation.loop is not None else 0.0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.task = self.loop.create_task(self.main())
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.loop.close()
+
+    def main(self):
+        # The coroutine run on the background loop
+        return self.simulation.run(*self.settings)
+
+    def queued_items(self):
+        return self.simulation.queued_items()
+
+    def stop(self):
+        if self.thread is not None:
+            if self.task is not None and not self.loop.is_closed():
+                self.loop.call_soon_threadsafe(self.task.cancel)
+            self.thread.join()
+        self.log.close()
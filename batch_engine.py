@@ -0,0 +1,174 @@
+import argparse
+import json
+from statistics import NormalDist
+
+from arrivals import poisson_parameters, poisson_version
+from event_engine import EventEngine, QueueSimulation
+from metrics import MetricsCollector
+from sim_config import DEFAULT_CONFIG_PATH, load_config, process_times
+
+try:
+    import numpy as np
+except ImportError:  # The GUI demos and the event engine do not need NumPy
+    np = None
+
+# Vectorized batch-replication engine. Many independent replications of a single-server FIFO
+# scenario advance together as NumPy arrays, one customer index at a time, using the Lindley
+# recursion (start = max(arrival, previous departure)) with the finite-buffer blocking rule of
+# ServerSimulator: an arrival is blocked when queue_length requests are already waiting.
+# Arrivals must be Poisson ("arrivals": {"kind": "poisson"}, resolved like arrivals_from_config; --poisson
+# turns a requests_sequence scenario into its Poisson version); service times are PROCESS_TIMES.
+
+CHUNK = 4096  # Customers drawn per replication at a time, so memory does not grow with the run length
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("batch_engine needs NumPy: pip install numpy")
+
+
+# Arrival rate, request types and their probabilities of a Poisson scenario; ValueError for other sources
+def arrival_model(config):
+    rate, mix = poisson_parameters(config)
+    total = sum(mix.values())
+    return rate, list(mix), [weight / total for weight in mix.values()]
+
+
+def _replication_rng(seed, replication):
+    return np.random.default_rng([seed, replication])
+
+
+def _draw(rng, rate, probabilities, size):
+    # The one place random numbers are drawn, shared by the batch engine and replication_arrivals
+    gaps = rng.exponential(1.0 / rate, size)
+    types = rng.choice(len(probabilities), size, p=probabilities)
+    return gaps, types
+
+
+# The arrivals of one replication as an arrival source for QueueSimulation.feed, drawn exactly as in simulate_batch
+def replication_arrivals(config, seed, replication, requests):
+    _require_numpy()
+    rate, types, probabilities = arrival_model(config)
+    rng = _replication_rng(seed, replication)
+    now = 0.0
+    for first in range(0, requests, CHUNK):
+        gaps, type_indices = _draw(rng, rate, probabilities, min(CHUNK, requests - first))
+        for gap, type_index in zip(gaps.tolist(), type_indices.tolist()):
+            now += gap
+            yield now, types[type_index]
+
+
+# Simulate `replications` independent runs of `requests` arrivals each; returns per-replication metric arrays
+def simulate_batch(config, replications=1000, requests=10000, seed=0):
+    _require_numpy()
+    queue_length = config["queue_length"]
+    if queue_length < 1:
+        raise ValueError("batch_engine needs queue_length >= 1")
+    if config.get("workers", 1) != 1 or config.get("worker_groups") or config.get("discipline", "fifo") != "fifo":
+        raise ValueError("batch_engine models a single FIFO server; use the event engine for pools and other disciplines")
+    rate, types, probabilities = arrival_model(config)
+    times = process_times(config)
+    service_of_type = np.array([times.get(request_type, 1) for request_type in types], dtype=float)
+    rngs = [_replication_rng(seed, replication) for replication in range(replications)]
+
+    rows = np.arange(replications)
+    capacity = queue_length + 1  # Waiting room plus the request in service
+    departures = np.full((replications, capacity), -np.inf)  # Ring of the last `capacity` admitted departures
+    head = np.zeros(replications, dtype=np.int64)  # Oldest entry of each ring
+    last_departure = np.zeros(replications)
+    now = np.zeros(replications)
+    admitted = np.zeros(replications, dtype=np.int64)
+    wait_sum = np.zeros(replications)
+    busy_sum = np.zeros(replications)
+
+    for first in range(0, requests, CHUNK):
+        size = min(CHUNK, requests - first)
+        gaps = np.empty((replications, size))
+        services = np.empty((replications, size))
+        for replication, rng in enumerate(rngs):
+            replication_gaps, type_indices = _draw(rng, rate, probabilities, size)
+            gaps[replication] = replication_gaps
+            services[replication] = service_of_type[type_indices]
+        arrivals = now[:, None] + np.cumsum(gaps, axis=1)
+        now = arrivals[:, -1]
+
+        for n in range(size):
+            arrival = arrivals[:, n]
+            service = services[:, n]
+            # Blocked when `capacity` admitted requests have not yet departed
+            accept = departures[rows, head] <= arrival
+            start = np.maximum(arrival, last_departure)
+            departure = start + service
+            departures[rows, head] = np.where(accept, departure, departures[rows, head])
+            head = np.where(accept, (head + 1) % capacity, head)
+            last_departure = np.where(accept, departure, last_departure)
+            admitted += accept
+            wait_sum += np.where(accept, start - arrival, 0.0)
+            busy_sum += np.where(accept, service, 0.0)
+
+    end = np.maximum(now, last_departure)
+    served = np.maximum(admitted, 1)
+    return {
+        "block_rate": 1.0 - admitted / requests,
+        "mean_wait": wait_sum / served,
+        "mean_sojourn": (wait_sum + busy_sum) / served,
+        "throughput": admitted / end,
+        "utilization": busy_sum / end,
+        "mean_queue_length": wait_sum / end  # Little's law over the whole run
+    }
+
+
+# Mean and normal-approximation confidence interval of each per-replication metric
+def confidence_intervals(results, confidence=0.95):
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    summary = {}
+    for name, values in results.items():
+        mean = float(values.mean())
+        half_width = float(z * values.std(ddof=1) / np.sqrt(len(values))) if len(values) > 1 else 0.0
+        summary[name] = {"mean": mean, "low": mean - half_width, "high": mean + half_width}
+    return summary
+
+
+# Re-run the first `replications` replications on the event-driven simulator with the same random
+# draws and return the largest absolute difference per metric (zero up to floating-point noise)
+def validate(config, replications=5, requests=2000, seed=0):
+    batch = simulate_batch(config, replications, requests, seed)
+    differences = {"block_rate": 0.0, "mean_wait": 0.0}
+    times = process_times(config)
+    for replication in range(replications):
+        engine = EventEngine()
+        metrics = MetricsCollector(times)
+        simulation = QueueSimulation(engine, config["queue_length"], times, metrics=metrics)
+        simulation.feed(replication_arrivals(config, seed, replication, requests))
+        engine.run()
+        block_rate = simulation.blocked / simulation.arrived
+        waited = sum(histogram.total for histogram in metrics.wait.values())
+        mean_wait = waited / max(simulation.completed, 1)
+        differences["block_rate"] = max(differences["block_rate"], float(abs(block_rate - batch["block_rate"][replication])))
+        differences["mean_wait"] = max(differences["mean_wait"], float(abs(mean_wait - batch["mean_wait"][replication])))
+    return differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many replications of a scenario as NumPy arrays.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH)
+    parser.add_argument("--replications", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=10000, help="arrivals per replication")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--poisson", action="store_true",
+                        help="treat the config's arrivals as Poisson at 1 / rq_time_arrival with the requests_sequence mix")
+    parser.add_argument("--validate", type=int, default=0, metavar="N",
+                        help="also replay the first N replications on the event engine and report the differences")
+    args = parser.parse_args(argv)
+    config = load_config(args.config)
+    if args.poisson:
+        config = poisson_version(config)
+
+    output = {"metrics": confidence_intervals(simulate_batch(config, args.replications, args.requests, args.seed))}
+    if args.validate:
+        output["validation_max_difference"] = validate(config, args.validate, args.requests, args.seed)
+    print(json.dumps(output, indent=2))
+
+
+if __name__ == "__main__":
+    main()
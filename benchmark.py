@@ -0,0 +1,341 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from arrivals import poisson_arrivals
+from async_sim import run_async
+from event_engine import EventEngine, QueueSimulation, run_scenario
+from event_log import BLOCK, ENQUEUE, FINISH, START, EventLog
+from metrics import MetricsCollector
+
+# Reproducible benchmark suite for the simulator hot paths and the GUI render cost.
+#   engine  events/sec of the event engine (the ServerSimulator-equivalent QueueSimulation) over a grid of
+#           arrival rates and queue lengths, plus requests/sec of the asyncio simulator
+#   memory  traced memory over a long run, sampled at regular simulated times. Everything on the hot path is
+#           preallocated or bounded (metrics histograms, the log ring), so growth after warm-up stays within a few
+#           KB of allocator noise; more than MEMORY_GROWTH_LIMIT_KB fails the run whatever the baseline says.
+#   gui     update_display cost (queue view + stats panel + log view + Tk redraw) at large queue_length and log
+#           sizes, and sprite animation frame cost. Runs on $DISPLAY, or starts Xvfb when there is none.
+# Results are written as JSON and compared against a stored baseline; a regression beyond the tolerance, or a
+# baseline section this run failed to measure, makes the run exit with status 1.
+# Usage: python benchmark.py [--quick] [--output bench_results.json] [--baseline bench_baseline.json]
+#                            [--save-baseline] [--tolerance 0.2] [--skip-gui]
+
+DEFAULT_BASELINE = "bench_baseline.json"
+PROCESS_TIMES = {"read": 3, "write": 5, "forward": 1}  # The shipped config.json costs
+MIX = {"read": 1, "write": 1, "forward": 1}
+MEAN_SERVICE = sum(PROCESS_TIMES.values()) / len(PROCESS_TIMES)
+SECTIONS = ("engine", "async", "memory", "gui")
+MEMORY_GROWTH_LIMIT_KB = 32.0
+
+
+def _best_of(repeats, run):
+    # Smallest wall time of `repeats` runs, with the result of the last one
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def bench_engine(loads, queue_lengths, requests, repeats=3, seed=1):
+    # One point per (offered load, queue length); load is arrival rate times mean service time per worker
+    points = []
+    for load in loads:
+        for queue_length in queue_lengths:
+            config = {"queue_length": queue_length, "read_time": PROCESS_TIMES["read"],
+                      "write_time": PROCESS_TIMES["write"], "forward_time": PROCESS_TIMES["forward"],
+                      "rq_time_arrival": MEAN_SERVICE / load,
+                      "arrivals": {"kind": "poisson", "count": requests, "seed": seed}}
+            seconds, simulation = _best_of(repeats, lambda: run_scenario(config, collect_metrics=True))
+            events = simulation.engine.events_processed
+            points.append({"load": load, "queue_length": queue_length, "events": events, "seconds": seconds,
+                           "events_per_sec": events / seconds, "block_rate": simulation.summary()["block_rate"]})
+    return points
+
+
+def bench_async(clients, duration, repeats=1):
+    config = {"queue_length": 15, "read_time": PROCESS_TIMES["read"], "write_time": PROCESS_TIMES["write"],
+              "forward_time": PROCESS_TIMES["forward"], "rq_time_arrival": 0.5, "workers": 8,
+              "clients": {"count": clients, "duration": duration, "seed": 1}}
+    seconds, simulation = _best_of(repeats, lambda: run_async(config))
+    return {"clients": clients, "requests": simulation.arrived, "seconds": seconds,
+            "requests_per_sec": simulation.arrived / seconds}
+
+
+def bench_memory(requests, samples=10, log_capacity=1000, seed=1):
+    # Stable load (70%) for `requests` arrivals with metrics and a ring-buffer log, sampling traced memory
+    rate = 0.7 / MEAN_SERVICE
+    duration = requests / rate
+    engine = EventEngine()
+    simulation = QueueSimulation(engine, 15, PROCESS_TIMES, log=EventLog(log_capacity, virtual_time=True),
+                                 metrics=MetricsCollector(PROCESS_TIMES))
+    readings = []
+
+    def sample():
+        readings.append(tracemalloc.get_traced_memory()[0])
+        if engine.now + duration / samples <= duration:
+            engine.schedule(duration / samples, sample)
+
+    tracemalloc.start()
+    try:
+        simulation.feed(poisson_arrivals(rate, MIX, duration=duration, seed=seed))
+        engine.schedule(duration / samples, sample)
+        started = time.perf_counter()
+        engine.run()
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # The first sample is after warm-up: histograms and the log ring have reached their working size
+    return {"requests": simulation.arrived, "seconds": seconds, "samples_kb": [reading / 1024 for reading in readings],
+            "growth_kb": (readings[-1] - readings[0]) / 1024 if readings else 0.0, "peak_kb": peak / 1024}
+
+
+# A virtual X server for the GUI benchmarks; returns the Xvfb process (None when a display already exists)
+def start_virtual_display(display=":99"):
+    if os.environ.get("DISPLAY"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        raise RuntimeError("no $DISPLAY and Xvfb is not installed")
+    process = subprocess.Popen([xvfb, display, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    socket_path = f"/tmp/.X11-unix/X{display.lstrip(':')}"
+    deadline = time.monotonic() + 5
+    while not os.path.exists(socket_path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError("Xvfb did not start")
+        time.sleep(0.05)
+    os.environ["DISPLAY"] = display
+    return process
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))] if ordered else 0.0
+
+
+def bench_gui(queue_lengths, log_sizes, frames=200, events_per_frame=20, sprites=40, seed=1):
+    import tkinter as tk
+    from gui_widgets import LogView, QueueView, SpriteAnimator, StatsPanel
+    from instrumentation import Instruments
+
+    colors = {"read": "red", "write": "green", "forward": "blue"}
+    types = list(colors)
+    rng = random.Random(seed)
+    points = []
+    root = tk.Tk()
+    try:
+        for queue_length in queue_lengths:
+            for log_size in log_sizes:
+                canvas = tk.Canvas(root, width=1200, height=800, bg="white")
+                canvas.pack()
+                text = tk.Text(root, height=15, width=100, state="disabled")
+                text.pack()
+                log = EventLog(log_size, virtual_time=True)
+                metrics = MetricsCollector(PROCESS_TIMES)
+                queue_view = QueueView(canvas, 300, 250, queue_length, colors, slot_size=40, pitch=40, max_width=650)
+                stats_panel = StatsPanel(canvas, 20, 20, metrics, clock=lambda: log.total, interval=0)
+                log_view = LogView(text, log, 15, highlight_blocked=True)
+                for seq in range(log_size):
+                    log.append(ENQUEUE, seq, types[seq % 3], float(seq))
+                queued = [rng.choice(types) for _ in range(queue_length // 2)]
+                costs = []
+                for frame in range(frames):
+                    # A frame's worth of churn: some requests served from the head, some new ones at the tail
+                    for _ in range(events_per_frame):
+                        kind = rng.choice((ENQUEUE, START, FINISH, BLOCK))
+                        request_type = rng.choice(types)
+                        if kind == ENQUEUE and len(queued) < queue_length:
+                            queued.append(request_type)
+                        elif kind == START and queued:
+                            queued.pop(0)
+                        log.append(kind, log.total, request_type, float(log.total))
+                    started = time.perf_counter()
+                    queue_view.update(queued)
+                    stats_panel.refresh()
+                    log_view.refresh()
+                    root.update()
+                    costs.append(time.perf_counter() - started)
+                canvas.destroy()
+                text.destroy()
+                points.append({"queue_length": queue_length, "log_size": log_size, "frames": frames,
+                               "update_ms": sum(costs) / len(costs) * 1000, "update_p95_ms": _percentile(costs, 95) * 1000})
+
+        # Sprite animation: keep `sprites` in flight and let the animator's own after() loop run for a while
+        canvas = tk.Canvas(root, width=1200, height=800, bg="white")
+        canvas.pack()
+        instruments = Instruments()
+        animator = SpriteAnimator(root, canvas, max_sprites=sprites, instruments=instruments)
+
+        def relaunch():
+            animator.launch(rng.choice(list(colors.values())), (200, 370), (900, 370), on_done=relaunch)
+
+        for _ in range(sprites):
+            relaunch()
+        deadline = time.perf_counter() + 2.0
+        while time.perf_counter() < deadline:
+            root.update()
+        animator.stop()
+        timer = instruments.timer("animation.frame")
+        if not timer.count:
+            # The animator only advances from Tk's after() loop; no frames means Tk never ran it
+            raise RuntimeError("sprite animation rendered no frames")
+        points.append({"sprites": sprites, "frames": timer.count,
+                       "frame_ms": timer.total / timer.count * 1000,
+                       "frame_max_ms": timer.max * 1000})
+    finally:
+        root.destroy()
+    return points
+
+
+# Flat {name: (value, higher_is_better, absolute slack)} view of a result set, for baseline comparison
+def key_metrics(results):
+    metrics = {}
+    for point in results.get("engine", []):
+        metrics[f"engine.load={point['load']:g}.queue={point['queue_length']}.events_per_sec"] = \
+            (point["events_per_sec"], True, 0.0)
+    if results.get("async"):
+        metrics["async.requests_per_sec"] = (results["async"]["requests_per_sec"], True, 0.0)
+    if results.get("memory"):
+        metrics["memory.growth_kb"] = (results["memory"]["growth_kb"], False, 64.0)
+        metrics["memory.peak_kb"] = (results["memory"]["peak_kb"], False, 256.0)
+    for point in results.get("gui") or []:
+        if "update_ms" in point:
+            metrics[f"gui.queue={point['queue_length']}.log={point['log_size']}.update_ms"] = \
+                (point["update_ms"], False, 0.1)
+        else:
+            metrics[f"gui.sprites={point['sprites']}.frame_ms"] = (point["frame_ms"], False, 0.1)
+    return metrics
+
+
+# Baseline measurements this run did not reproduce: a section (of those it was asked to measure) the baseline
+# has and this run lacks, or, when both use the same grid, a baseline metric this run did not measure. A
+# section the baseline lacks (e.g. gui, recorded where Tk could not run) is simply not compared.
+def missing(results, baseline, sections=SECTIONS, same_grid=True):
+    problems = []
+    for section in sections:
+        if baseline.get(section) and not results.get(section):
+            problems.append(f"section '{section}' is in the baseline but missing from the current run")
+    if same_grid:
+        current = key_metrics(results)
+        for name in key_metrics(baseline):
+            section = name.split(".", 1)[0]
+            if section in sections and results.get(section) and name not in current:
+                problems.append(f"metric '{name}' is in the baseline but was not measured")
+    return problems
+
+
+# (name, baseline, current, relative change, regressed) for every metric present in both result sets
+def compare(results, baseline, tolerance=0.2):
+    current = key_metrics(results)
+    rows = []
+    for name, (base_value, higher_is_better, slack) in key_metrics(baseline).items():
+        if name not in current:
+            continue  # Reported by missing()
+        value = current[name][0]
+        change = (value - base_value) / base_value if base_value else 0.0
+        if higher_is_better:
+            regressed = value < base_value * (1 - tolerance) - slack
+        else:
+            regressed = value > base_value * (1 + tolerance) + slack
+        rows.append((name, base_value, value, change, regressed))
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark simulator throughput, memory and GUI render cost.")
+    parser.add_argument("--quick", action="store_true", help="smaller grid and shorter runs")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the results JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown before failing")
+    parser.add_argument("--skip-gui", action="store_true", help="skip the Tk benchmarks")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.quick:
+        loads, queue_lengths, requests, memory_requests = (0.5, 1.0, 2.0), (15, 1000), 20000, 50000
+        gui_queues, gui_logs = (15, 1000), (1000,)
+    else:
+        loads, queue_lengths, requests, memory_requests = (0.25, 0.5, 0.9, 1.0, 1.5, 2.0, 4.0), (15, 100, 1000, 10000), \
+            100000, 500000
+        gui_queues, gui_logs = (15, 100, 1000, 10000), (1000, 100000)
+
+    results = {
+        "meta": {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                 "machine": platform.machine(), "system": platform.system(), "time": time.time(),
+                 "quick": args.quick},
+        "engine": bench_engine(loads, queue_lengths, requests),
+        "async": bench_async(2000 if args.quick else 10000, 200.0 if args.quick else 600.0),
+        "memory": bench_memory(memory_requests),
+        "gui": None
+    }
+    if not args.skip_gui:
+        import tkinter
+
+        display = None
+        try:
+            display = start_virtual_display()
+            results["gui"] = bench_gui(gui_queues, gui_logs)
+        except (RuntimeError, tkinter.TclError) as error:
+            # No usable display: e.g. $DISPLAY set but unreachable, or Xvfb dying after its socket appeared
+            print(f"GUI benchmarks skipped: {error}", file=sys.stderr)
+        finally:
+            if display is not None:
+                display.terminate()
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    for name, (value, _, _) in key_metrics(results).items():
+        print(f"{name:<48} {value:14.2f}")
+
+    if results["memory"]["growth_kb"] > MEMORY_GROWTH_LIMIT_KB:
+        # A leak fails the run on its own and is never accepted as a baseline
+        print(f"error: memory grew {results['memory']['growth_kb']:.1f} KB after warm-up "
+              f"(limit {MEMORY_GROWTH_LIMIT_KB:g} KB)", file=sys.stderr)
+        sys.exit(1)
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    same_grid = baseline.get("meta", {}).get("quick") == args.quick
+    if not same_grid:
+        print("warning: baseline and current run use different --quick settings; only the metrics both measured "
+              "are compared", file=sys.stderr)
+    rows = compare(results, baseline, args.tolerance)
+    print(f"\n{'metric':<48} {'baseline':>14} {'current':>14} {'change':>8}")
+    for name, base_value, value, change, regressed in rows:
+        print(f"{name:<48} {base_value:14.2f} {value:14.2f} {change:+8.1%}{'  REGRESSION' if regressed else ''}")
+    sections = [section for section in SECTIONS if section != "gui" or not args.skip_gui]
+    for section in sections:
+        if not baseline.get(section):
+            print(f"note: the baseline has no '{section}' section; it is not compared", file=sys.stderr)
+    problems = missing(results, baseline, sections, same_grid)
+    for problem in problems:
+        print(f"error: {problem}", file=sys.stderr)
+    if problems or any(row[4] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
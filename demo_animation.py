@@ -1,22 +1,23 @@
 import tkinter as tk
 from PIL import Image, ImageTk
-import json
+import argparse
 import time
-import threading
-from queue import Queue, Full, Empty
-from datetime import datetime
+from async_sim import AsyncSimulationThread
+from gui_widgets import InstrumentationControls, LogView, QueueView, RenderScheduler, SpriteAnimator, StatsPanel
+from instrumentation import Instruments
+from loopback import LoopbackThread
+from server_simulator import ServerSimulator, queue_capacity
+from sim_config import load_config
+from trace_file import TraceReader, TraceReplayer
 
 # Load configurations from config.json
-with open("config.json", "r") as file:
-    config = json.load(file)
-TIME_DELAY = config["rq_time_arrival"]
-QUEUE_LENGTH = config["queue_length"]
-PROCESS_TIMES = {
-    "read": config["read_time"],
-    "write": config["write_time"],
-    "forward": config["forward_time"]
-}
-REQUEST_SEQUENCE = config["requests_sequence"]
+config = load_config()
+QUEUE_CAPACITY = queue_capacity(config)  # Queue slots to draw
+LOG_CAPACITY = config.get("log_capacity", 1000)  # Log entries kept in memory
+FRAME_MS = config.get("frame_ms", 50)  # GUI frame interval; at most one repaint per frame
+INSTRUMENTATION = config.get("instrumentation")  # Opt-in timers, GUI overlay, stats dump and profilers, see instrumentation.py
+ANIMATION_SPEED = config.get("animation_speed", 400)  # Request sprite speed in pixels per second
+MAX_SPRITES = config.get("max_sprites", 40)  # Sprites on screen at once; extra arrivals are only counted
 
 # Color mapping for request types
 REQUEST_COLORS = {
@@ -25,67 +26,17 @@ REQUEST_COLORS = {
     "forward": "blue"
 }
 
-# Server class simulating request processing with a limited queue
-class ServerSimulator:
-    def __init__(self, queue_length):
-        self.queue = Queue(maxsize=queue_length)
-        self.running = True
-        self.log = []
-        self.request_counts = {"read": 0, "write": 0, "forward": 0}  # Track request counts
-        self.update_queue_display_callback = None  # Placeholder for the callback
-
-        # Start the processing thread
-        self.process_thread = threading.Thread(target=self.process_requests)
-        self.process_thread.start()
-
-    def add_request(self, request_type):
-        # Generate a unique name for the request, e.g., "Read1", "Write2", etc.
-        self.request_counts[request_type] += 1
-        request_name = f"{request_type.capitalize()}{self.request_counts[request_type]}"
-        
-        try:
-            self.queue.put_nowait((request_name, request_type))
-            self.log.append(f"[{datetime.now().strftime('%H:%M:%S')}] Request '{request_name}' added to the queue.")
-            if self.update_queue_display_callback:
-                self.update_queue_display_callback()
-        except Full:
-            # Highlight "Queue is full" messages in red
-            self.log.append(f"[{datetime.now().strftime('%H:%M:%S')}] Queue is full! Request '{request_name}' blocked.")
-            if self.update_queue_display_callback:
-                self.update_queue_display_callback(request_name, request_type, blocked=True)
-
-    def process_requests(self):
-        while self.running:
-            try:
-                # Get the next request from the queue
-                request_name, request_type = self.queue.get(timeout=1)
-                process_time = PROCESS_TIMES.get(request_type, 1)
-                
-                self.log.append(f"[{datetime.now().strftime('%H:%M:%S')}] Processing '{request_name}' (time: {process_time}s)...")
-                
-                # Simulate request processing time
-                time.sleep(process_time)
-                self.log.append(f"[{datetime.now().strftime('%H:%M:%S')}] '{request_name}' processed.")
-                
-                self.queue.task_done()
-                
-                # Update queue display after processing
-                if self.update_queue_display_callback:
-                    self.update_queue_display_callback()
-            except Empty:
-                continue
-
-    def stop(self):
-        self.running = False
-        self.process_thread.join()
-
-# Tkinter GUI Application
+# Tkinter GUI Application; `server` is a live ServerSimulator or a TraceReplayer playing back a recorded trace
 class App(tk.Tk):
-    def __init__(self, server):
+    def __init__(self, server, instruments=None):
         super().__init__()
         self.title("Server Queue Simulation with Animation")
         self.geometry("1200x800")
         self.server = server
+        self.replaying = isinstance(server, TraceReplayer)
+        self.clients_mode = isinstance(server, AsyncSimulationThread)  # Load from asyncio clients or the loopback generator
+        self.ticking = self.replaying or isinstance(server, ServerSimulator)  # Advanced by the App once per frame
+        self.instruments = instruments
 
         # Load images
         self.client_image = ImageTk.PhotoImage(Image.open("client.png").resize((100, 100)))
@@ -97,10 +48,23 @@ class App(tk.Tk):
         # Set flags for controlling simulation
         self.running = False
         self.paused = False
-        self.thread = None
+
+        # One repaint per frame on the main thread; client and loopback threads only mark the view dirty or post events
+        self.render_scheduler = RenderScheduler(self, self.update_display, FRAME_MS, instruments)
+        self.instrumentation = None
+        if instruments is not None:
+            self.instrumentation = InstrumentationControls(self, self.canvas, 600, 20, instruments,
+                                                           events=lambda: self.server.log.total,
+                                                           settings=INSTRUMENTATION)
+        if self.ticking:
+            self.server.update_queue_display_callback = self.on_arrival
+            self.last_tick = time.perf_counter()
+            self.tick_job = self.after(FRAME_MS, self.tick)
+        else:
+            self.server.update_queue_display_callback = self.on_server_change
 
         # Update queue and log display
-        self.update_display()
+        self.render_scheduler.start()
 
     def create_ui_elements(self):
         # Create a canvas for drawing
@@ -119,17 +83,21 @@ class App(tk.Tk):
         # Add "Request Queue" label above the queue
         self.canvas.create_text(600, 200, text="Request Queue", font=("Arial", 16, "bold"))
 
-        # Queue slots for visualizing requests in a compact style
-        self.queue_slots = []
+        # Live metrics panel
+        admission = None if self.replaying else self.server.admission
+        self.stats_panel = StatsPanel(self.canvas, 20, 20, self.server.metrics, clock=lambda: self.server.now,
+                                      admission=admission)
+
+        # Queue slots for visualizing requests in a compact style (an aggregated occupancy bar when they would not fit)
         slot_x_start = 300  # Starting X position for the queue slots
         slot_y = 250  # Y position for all queue slots
-        for i in range(QUEUE_LENGTH):
-            slot = self.canvas.create_rectangle(slot_x_start + i * 40, slot_y, slot_x_start + 40 + i * 40, slot_y + 40, outline="orange", fill="white")
-            self.queue_slots.append(slot)
+        self.queue_view = QueueView(self.canvas, slot_x_start, slot_y, QUEUE_CAPACITY, REQUEST_COLORS, slot_size=40, pitch=40, max_width=650)
 
         # Blocked Area
         #self.canvas.create_text(1050, 100, text="Blocked Area", font=("Arial", 16, "bold"))
-        self.blocked_requests = []  # List to keep track of blocked request visuals
+        # Request sprites: one animation ticker, pooled canvas items, blocked sprites kept in the Blocked Area
+        self.animator = SpriteAnimator(self, self.canvas, speed=ANIMATION_SPEED, max_sprites=MAX_SPRITES,
+                                       counter_pos=(600, 470), instruments=self.instruments)
 
         # Status Log
         self.status_label = tk.Label(self, text="Status Log", font=("Arial", 16))
@@ -138,6 +106,7 @@ class App(tk.Tk):
         # Text widget to show the status log
         self.status_display = tk.Text(self, height=10, width=130, state="disabled", font=("Arial", 10))
         self.status_display.place(x=50, y=550)
+        self.log_view = LogView(self.status_display, self.server.log, 15, highlight_blocked=True)
 
         # Control buttons
         self.start_button = tk.Button(self, text="Start", font=("Arial", 12), command=self.start_simulation)
@@ -149,88 +118,129 @@ class App(tk.Tk):
         self.end_button = tk.Button(self, text="End", font=("Arial", 12), command=self.on_closing)
         self.end_button.place(x=1100, y=700)
 
+        # Replay controls: time display, speed multiplier and jump-to-time
+        if self.replaying:
+            self.replay_time = self.canvas.create_text(1050, 480, text="", font=("Arial", 12))
+            tk.Label(self, text="Speed", font=("Arial", 12)).place(x=960, y=500)
+            self.speed_box = tk.Spinbox(self, values=(0.25, 0.5, 1, 2, 5, 10, 50, 100, 1000), width=6,
+                                        font=("Arial", 12), command=self.set_replay_speed)
+            self.speed_box.delete(0, tk.END)
+            self.speed_box.insert(0, "1")
+            self.speed_box.place(x=1030, y=500)
+            self.jump_entry = tk.Entry(self, width=8, font=("Arial", 12))
+            self.jump_entry.place(x=960, y=545)
+            tk.Button(self, text="Jump", font=("Arial", 12), command=self.jump_to_time).place(x=1060, y=540)
+
     def start_simulation(self):
+        if self.ticking:
+            # Start or resume the virtual clock; a live run feeds its arrival source on the first start
+            self.paused = False
+            self.pause_button.config(text="Pause")
+            if self.replaying:
+                self.server.playing = True
+            else:
+                self.server.start()
+            return
         if not self.running:
             self.running = True
             self.paused = False
-            self.thread = threading.Thread(target=self.process_sequence, daemon=True)
-            self.thread.start()
+            self.server.start()
 
     def pause_simulation(self):
         self.paused = not self.paused
         self.pause_button.config(text="Resume" if self.paused else "Pause")
+        if self.ticking:
+            self.server.playing = not self.paused
 
-    def process_sequence(self):
-        for request_type in REQUEST_SEQUENCE:
-            if not self.running:
-                break
-            while self.paused:
-                time.sleep(0.1)  # Wait while paused
-            # Animate request moving from client to queue
-            self.animate_request_to_queue(request_type)
-            self.server.add_request(request_type)
-            self.update_display()
-            time.sleep(TIME_DELAY)  # Delay between each request
+    def set_replay_speed(self):
+        self.server.speed = float(self.speed_box.get())
+
+    def jump_to_time(self):
+        try:
+            when = float(self.jump_entry.get())
+        except ValueError:
+            return
+        self.server.seek(when)
+        # The replayer restarts its log and metrics at the new time
+        self.log_view.reset(self.server.log)
+        self.stats_panel.reset(self.server.metrics)
+        self.render_scheduler.request()
+
+    def tick(self):
+        # Advance the replay or simulation clock by the wall time since the last tick, scaled by its speed
+        now = time.perf_counter()
+        if self.server.advance(now - self.last_tick):
+            self.render_scheduler.request()
+        self.last_tick = now
+        self.tick_job = self.after(FRAME_MS, self.tick)
+
+    def on_arrival(self, request_name, request_type, blocked=False):
+        # Runs on the main thread inside tick(): animate arrivals and blocked requests
+        self.render_scheduler.post(("blocked" if blocked else "arrival", request_type))
 
     def animate_request_to_queue(self, request_type, blocked=False):
-        # Create a small rectangle representing the request moving from Client to Queue
-        request_label = self.canvas.create_rectangle(200, 370, 250, 420, fill=REQUEST_COLORS[request_type])
-
-        # Define the animation function for moving the request label
-        def move_request(x, y, final_x, final_y):
-            if x < final_x:
-                self.canvas.coords(request_label, x, y, x + 50, y + 50)
-                self.after(50, lambda: move_request(x + 20, y, final_x, final_y))  # Move slower by incrementing x
-            else:
-                # When animation finishes, remove the label and update the queue if not blocked
-                if blocked:
-                    self.blocked_requests.append(request_label)
-                else:
-                    self.canvas.delete(request_label)
-                    self.update_display()  # Update the queue colors only after animation completes
-
-        # Move to Blocked Area if blocked, else move to queue end
+        # Move a small rectangle representing the request from Client to the Blocked Area if blocked,
+        # else to the queue end; the queue colors are only updated after the animation completes
         final_x, final_y = (1000, 80) if blocked else (900, 370)
-        move_request(200, 370, final_x, final_y)
-
-    def update_display(self, request_name=None, request_type=None, blocked=False):
-        # Update queue slots with colors based on request types
-        queue_items = list(self.server.queue.queue)
-        for i in range(QUEUE_LENGTH):
-            if i < len(queue_items):
-                _, req_type = queue_items[i]
-                color = REQUEST_COLORS.get(req_type, "white")
-                self.canvas.itemconfig(self.queue_slots[i], fill=color)
-            else:
-                self.canvas.itemconfig(self.queue_slots[i], fill="white")
-
-        # If a request is blocked, animate it moving to the Blocked Area
-        if blocked and request_name and request_type:
-            self.animate_request_to_queue(request_type, blocked=True)
-
-        # Update log display with timestamps
-        self.status_display.config(state="normal")
-        self.status_display.delete(1.0, tk.END)
-        for entry in self.server.log[-15:]:
-            if "Queue is full" in entry:
-                self.status_display.insert(tk.END, entry + "\n", "red")
-                self.status_display.tag_config("red", foreground="red")
-            else:
-                self.status_display.insert(tk.END, entry + "\n")
-        self.status_display.config(state="disabled")
+        self.animator.launch(REQUEST_COLORS[request_type], (200, 370), (final_x, final_y), park=blocked,
+                             on_done=None if blocked else self.render_scheduler.request)
+
+    def on_server_change(self, request_name=None, request_type=None, blocked=False):
+        # Runs on client or loopback threads: never touch Tk here, just hand the change to the render scheduler
+        if blocked:
+            self.render_scheduler.post(("blocked", request_type))
+        else:
+            self.render_scheduler.request()
+
+    def update_display(self, events=()):
+        # Start animations for arrivals and blocked requests posted since the last frame
+        for kind, request_type in events:
+            self.animate_request_to_queue(request_type, blocked=(kind == "blocked"))
+
+        # Update queue slots with colors based on request types; only changed slots are touched
+        self.queue_view.update([item.type for item in self.server.queued_items()])
+
+        # Latency, throughput and utilization so far
+        self.stats_panel.refresh()
+
+        # Update log display with only the entries added since the last tick
+        self.log_view.refresh()
 
-        # Schedule the next update
-        self.after(500, self.update_display)
+        if self.replaying:
+            self.canvas.itemconfig(self.replay_time, text=f"t = {self.server.now:.2f}s / {self.server.reader.end_time():.2f}s")
 
     def on_closing(self):
         self.running = False
+        if self.ticking:
+            self.after_cancel(self.tick_job)
+        self.render_scheduler.stop()
+        self.animator.stop()
+        if self.instrumentation is not None:
+            self.instrumentation.stop()
         self.server.stop()
         self.destroy()
 
-# Main function
+# Main function; run with --replay run.trace to play back a trace recorded by headless.py --record,
+# with --clients 10000 --speed 10 to drive the queue with simulated asyncio clients,
+# or with --loopback to show the measured queue and rejections of a real localhost TCP server
 def main():
-    server = ServerSimulator(QUEUE_LENGTH)
-    app = App(server)
+    parser = argparse.ArgumentParser(description="Animated server queue simulation.")
+    parser.add_argument("--replay", metavar="TRACE", help="replay a recorded binary trace instead of simulating")
+    parser.add_argument("--clients", type=int, metavar="N", help="drive the queue with N simulated asyncio clients")
+    parser.add_argument("--loopback", action="store_true", help="measure a real localhost TCP server under the configured load")
+    parser.add_argument("--speed", type=float, default=1.0, help="simulated seconds per wall-clock second (the replay speed is set in the window)")
+    parser.add_argument("--instrument", action="store_true", help="time the hot paths and show the overlay (F8/F9/F10 toggles)")
+    args = parser.parse_args()
+    instruments = Instruments() if args.instrument or INSTRUMENTATION is not None else None
+    if args.replay:
+        server = TraceReplayer(TraceReader(args.replay), LOG_CAPACITY)
+    elif args.loopback:
+        server = LoopbackThread(config, speed=args.speed, log_capacity=LOG_CAPACITY)
+    elif args.clients:
+        server = AsyncSimulationThread(config, args.clients, speed=args.speed, log_capacity=LOG_CAPACITY)
+    else:
+        server = ServerSimulator(config, instruments, speed=args.speed)
+    app = App(server, instruments)
     app.protocol("WM_DELETE_WINDOW", app.on_closing)
     app.mainloop()
 
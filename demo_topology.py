@@ -0,0 +1,108 @@
+import tkinter as tk
+import argparse
+import time
+
+from arrivals import arrivals_from_config
+from event_engine import EventEngine
+from gui_widgets import QueueView, RenderScheduler
+from sim_config import DEFAULT_CONFIG_PATH, load_config
+from topology import Topology
+
+# Per-node view of a multi-node topology: one queue row per node, with its blocked count and
+# utilization, while the event engine plays the scenario back in (optionally accelerated) real time.
+
+# Color mapping for request types
+REQUEST_COLORS = {
+    "read": "red",
+    "write": "green",
+    "forward": "blue"
+}
+
+ROW_HEIGHT = 80
+FRAME_MS = 50
+
+# Used when the config has no "topology" section (the shipped config.json has none): arrivals go to the
+# less loaded of two front nodes, which both pass finished "forward" requests on to a backend node
+DEFAULT_TOPOLOGY = {
+    "nodes": [{"name": "front-a"}, {"name": "front-b"}, {"name": "backend", "workers": 2}],
+    "balancer": "type_affinity",
+    "affinity": {"read": ["front-a", "front-b"], "write": ["front-a", "front-b"], "forward": ["front-a", "front-b"]},
+    "forward_to": {"front-a": "backend", "front-b": "backend"}
+}
+
+
+# Tkinter GUI Application
+class App(tk.Tk):
+    def __init__(self, topology, speed=1.0):
+        super().__init__()
+        self.title("Server Topology Simulation")
+        self.topology = topology
+        self.speed = speed
+        self.geometry(f"1000x{120 + ROW_HEIGHT * len(topology.nodes)}")
+
+        # Create UI elements
+        self.create_ui_elements()
+
+        # The engine runs on the main thread, advanced to the scaled wall clock once per frame
+        self.started = time.perf_counter()
+        self.render_scheduler = RenderScheduler(self, self.update_display, FRAME_MS)
+        self.render_scheduler.start()
+        self.tick_job = self.after(FRAME_MS, self.tick)
+
+    def create_ui_elements(self):
+        self.canvas = tk.Canvas(self, width=1000, height=120 + ROW_HEIGHT * len(self.topology.nodes), bg="white")
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas.create_text(20, 20, text=f"Load balancer: {self.topology.balancer.policy}", anchor="nw",
+                                font=("Arial", 14, "bold"))
+        self.clock_text = self.canvas.create_text(980, 20, text="", anchor="ne", font=("Arial", 12))
+
+        # One queue row per node
+        self.node_rows = []
+        for index, node in enumerate(self.topology.nodes):
+            y = 70 + index * ROW_HEIGHT
+            self.canvas.create_text(20, y + 20, text=node.name, anchor="w", font=("Arial", 12, "bold"))
+            queue_view = QueueView(self.canvas, 120, y, node.queue_length, REQUEST_COLORS, slot_size=30, pitch=35,
+                                   max_width=600)
+            stats = self.canvas.create_text(760, y + 20, text="", anchor="w", font=("Courier", 10))
+            self.node_rows.append((node, queue_view, stats))
+
+    def tick(self):
+        engine = self.topology.engine
+        if engine.run(until=(time.perf_counter() - self.started) * self.speed):
+            self.render_scheduler.request()
+        self.tick_job = self.after(FRAME_MS, self.tick) if engine.calendar else None
+
+    def update_display(self, events=()):
+        for node, queue_view, stats in self.node_rows:
+            queue_view.update([item.type for item in node.queued_items()])
+            self.canvas.itemconfig(stats, text=f"busy {node.busy}/{node.total_workers()}\n"
+                                               f"blocked {node.blocked}/{node.arrived}")
+        self.canvas.itemconfig(self.clock_text, text=f"t = {self.topology.engine.now:.1f}s  "
+                                                     f"forwarded {self.topology.forwarded}")
+
+    def on_closing(self):
+        if self.tick_job is not None:
+            self.after_cancel(self.tick_job)
+        self.render_scheduler.stop()
+        self.destroy()
+
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description="Animated multi-node topology simulation.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH,
+                        help="scenario file; without a \"topology\" section it runs DEFAULT_TOPOLOGY")
+    parser.add_argument("--speed", type=float, default=1.0, help="simulated seconds per wall-clock second")
+    args = parser.parse_args()
+    config = load_config(args.config)
+    config.setdefault("topology", DEFAULT_TOPOLOGY)
+
+    engine = EventEngine()
+    topology = Topology(engine, config)
+    topology.feed(arrivals_from_config(config))
+    app = App(topology, args.speed)
+    app.protocol("WM_DELETE_WINDOW", app.on_closing)
+    app.mainloop()
+
+if __name__ == "__main__":
+    main()
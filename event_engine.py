@@ -0,0 +1,301 @@
+import heapq
+import time
+from collections import deque
+from itertools import count
+
+from admission import client_from_config, limiter_from_config
+from arrivals import arrivals_from_config
+from event_log import BLOCK, ENQUEUE, FINISH, START, EventLog
+from metrics import MetricsCollector
+from request import Request, RequestLedger, type_codes
+from scheduling import make_queue, scheduling_options
+from sim_config import process_times
+from trace_file import TraceWriter
+
+
+# Discrete-event engine: a heap-ordered event calendar driven by a virtual clock
+class EventEngine:
+    def __init__(self):
+        self.now = 0.0
+        self.calendar = []
+        self.events_processed = 0
+        self.cancelled = set()  # Sequence numbers of events to drop unrun, without advancing the clock to them
+        self._order = count()  # Tie-breaker so same-time events run in scheduling order
+
+    # Both return the event's sequence number, for cancel()
+    def schedule(self, delay, handler, *args):
+        seq = next(self._order)
+        heapq.heappush(self.calendar, (self.now + delay, seq, handler, args))
+        return seq
+
+    def schedule_at(self, when, handler, *args):
+        seq = next(self._order)
+        heapq.heappush(self.calendar, (when, seq, handler, args))
+        return seq
+
+    def cancel(self, seq):
+        # E.g. a timeout whose request was served first; a stale timer would otherwise push `now` past the run
+        self.cancelled.add(seq)
+
+    def next_time(self):
+        calendar = self.calendar
+        while calendar and calendar[0][1] in self.cancelled:
+            self.cancelled.discard(heapq.heappop(calendar)[1])
+        return calendar[0][0] if calendar else None
+
+    def run(self, until=None):
+        # Pop events in time order as fast as possible; optionally stop at a virtual time
+        calendar = self.calendar
+        cancelled = self.cancelled
+        pop = heapq.heappop
+        processed = 0
+        if until is None:
+            while calendar:
+                when, seq, handler, args = pop(calendar)
+                if cancelled and seq in cancelled:
+                    cancelled.discard(seq)
+                    continue
+                self.now = when
+                handler(*args)
+                processed += 1
+        else:
+            while calendar and calendar[0][0] <= until:
+                when, seq, handler, args = pop(calendar)
+                if cancelled and seq in cancelled:
+                    cancelled.discard(seq)
+                    continue
+                self.now = when
+                handler(*args)
+                processed += 1
+            if until > self.now:
+                self.now = until
+        self.events_processed += processed
+        return processed
+
+    def run_realtime(self, speed=1.0, tick=0.05, should_stop=None):
+        # Real-time playback: advance the virtual clock in step with the wall clock (scaled by speed)
+        start = time.perf_counter()
+        while self.calendar:
+            if should_stop is not None and should_stop():
+                break
+            self.run(until=(time.perf_counter() - start) * speed)
+            time.sleep(tick)
+
+
+# A group of identical workers pulling from one queue partition
+class WorkerPool:
+    __slots__ = ("workers", "idle", "queue", "capacity")
+
+    def __init__(self, workers, capacity=None, queue=None):
+        self.workers = workers
+        self.idle = workers
+        self.queue = deque() if queue is None else queue  # Any scheduling.make_queue queue
+        self.capacity = capacity  # None means the partition shares the simulation-wide queue_length bound
+
+
+# Event-driven equivalent of ServerSimulator: same bounded queue and per-type service times,
+# but service is a scheduled completion event instead of time.sleep.
+# The queue order follows `scheduling` (keyword arguments of scheduling.make_queue), FIFO by default.
+# Either `workers` identical workers share one queue, or `worker_groups` maps each request type
+# to its own dedicated workers; groups share the queue_length bound unless `queue_partitions` splits it.
+class QueueSimulation:
+    def __init__(self, engine, queue_length, process_times, workers=1, worker_groups=None,
+                 queue_partitions=None, log=None, metrics=None, scheduling=None, limiter=None, ledger=None):
+        self.engine = engine
+        self.queue_length = queue_length
+        self.process_times = process_times
+        self.pools, self.pool_for = build_pools(process_times, queue_length, workers, worker_groups, queue_partitions,
+                                                scheduling)
+        self.queued = 0
+        self.busy = 0  # Workers currently serving a request, across all pools
+        self.log = log  # Optional EventLog
+        self.metrics = metrics  # Optional MetricsCollector
+        self.ledger = ledger  # Optional request.RequestLedger of every finished request
+        self.limiter = limiter  # Optional admission limiter (see admission.py) consulted before the queue bound
+        self.admission = None  # AdmissionClient feeding this simulation, if any
+        self.request_counts = {request_type: 0 for request_type in process_times}  # Track request counts
+        self.type_codes = type_codes(process_times)
+        self.listeners = []  # Callables notified as listener(kind, time, request_id, request_type)
+        self.arrived = 0
+        self.blocked = 0
+        self.shed = 0  # Blocked by the limiter while the queue still had room
+        self.completed = 0
+
+    def add_request(self, request_type):
+        # Number requests per type, e.g. Read1, Write2; names are only built for display
+        self.request_counts[request_type] += 1
+        request_id = self.request_counts[request_type]
+        self.arrived += 1
+        now = self.engine.now
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.on_arrival(now, request_type)
+
+        # Requests in service have left the queue, so only waiting requests count against the bound
+        pool = self.pool_for[request_type]
+        if pool.capacity is None:
+            depth, bound = self.queued, self.queue_length
+        else:
+            depth, bound = len(pool.queue), pool.capacity
+        shed = depth < bound and self.limiter is not None and not self.limiter.admit(now, request_type, depth, bound)
+        if depth >= bound or shed:
+            self.blocked += 1
+            if metrics is not None:
+                metrics.on_block(now, request_type)
+            if shed:
+                self.shed += 1
+                self._emit(BLOCK, request_id, request_type, "shed")
+            else:
+                self._emit(BLOCK, request_id, request_type)
+            return
+        pool.queue.append(Request(request_id, self.type_codes[request_type], now))
+        self.queued += 1
+        if metrics is not None:
+            metrics.on_enqueue(now, request_type)
+        self._emit(ENQUEUE, request_id, request_type)
+        if pool.idle:
+            self._start_next(pool)
+
+    def _start_next(self, pool):
+        request = pool.queue.popleft()
+        request_type = request.type
+        now = request.start = self.engine.now
+        self.queued -= 1
+        self.busy += 1
+        pool.idle -= 1
+        process_time = self.process_times.get(request_type, 1)
+        if self.metrics is not None:
+            self.metrics.on_start(now, request_type, now - request.arrival)
+        self._emit(START, request.id, request_type, process_time)
+        self.engine.schedule(process_time, self._finish, pool, request, request_type)
+
+    def _finish(self, pool, request, request_type):
+        now = request.finish = self.engine.now
+        self.completed += 1
+        self.busy -= 1
+        pool.idle += 1
+        if self.metrics is not None:
+            self.metrics.on_finish(now, request_type, now - request.arrival)
+        if self.ledger is not None:
+            self.ledger.record(request)
+        self._emit(FINISH, request.id, request_type)
+        if pool.queue:
+            self._start_next(pool)
+
+    def _emit(self, kind, request_id, request_type, detail=None):
+        if self.log is not None:
+            self.log.append(kind, request_id, request_type, self.engine.now, detail)
+        for listener in self.listeners:
+            listener(kind, self.engine.now, request_id, request_type)
+
+    def has_room(self, request_type):
+        pool = self.pool_for[request_type]
+        if pool.capacity is None:
+            return self.queued < self.queue_length
+        return len(pool.queue) < pool.capacity
+
+    def queued_items(self):
+        # Waiting Requests across all partitions, for display
+        items = []
+        for pool in self.pools.values():
+            items.extend(pool.queue)
+        return items
+
+    def total_workers(self):
+        return sum(pool.workers for pool in self.pools.values())
+
+    def busy_workers(self):
+        return self.busy
+
+    def feed(self, arrivals):
+        feed_arrivals(self.engine, arrivals, self.add_request)
+
+    def summary(self):
+        return {
+            "sim_time": self.engine.now,
+            "events": self.engine.events_processed,
+            "arrived": self.arrived,
+            "accepted": self.arrived - self.blocked,
+            "blocked": self.blocked,
+            "shed": self.shed,
+            "completed": self.completed,
+            "block_rate": self.blocked / self.arrived if self.arrived else 0.0
+        }
+
+
+# Schedule arrivals lazily from an iterable of (time, request_type): only the next one is ever on the calendar
+def feed_arrivals(engine, arrivals, add_request):
+    arrivals = iter(arrivals)
+
+    def schedule_next():
+        for when, request_type in arrivals:
+            engine.schedule_at(when, arrive, request_type)
+            return
+
+    def arrive(request_type):
+        add_request(request_type)
+        schedule_next()
+
+    schedule_next()
+
+
+# Build a QueueSimulation from a scenario config (or one node of a topology)
+def simulation_from_config(engine, config, log=None):
+    times = process_times(config)
+    return QueueSimulation(engine, config["queue_length"], times,
+                           workers=config.get("workers", 1),
+                           worker_groups=config.get("worker_groups"),
+                           queue_partitions=config.get("queue_partitions"),
+                           log=log,
+                           scheduling=scheduling_options(config, times),
+                           limiter=limiter_from_config(config))
+
+
+# Build the worker pools and the request type -> pool mapping
+def build_pools(process_times, queue_length, workers=1, worker_groups=None, queue_partitions=None, scheduling=None):
+    scheduling = scheduling or {}
+    if not worker_groups:
+        pool = WorkerPool(workers, queue=make_queue(**scheduling))
+        return {"*": pool}, {request_type: pool for request_type in process_times}
+    missing = [request_type for request_type in process_times if request_type not in worker_groups]
+    if missing:
+        raise ValueError(f"No worker group configured for request types: {missing}")
+    # Without partitions every group shares the queue_length bound; a type missing from the partitions gets queue_length
+    if queue_partitions:
+        pools = {request_type: WorkerPool(count, queue_partitions.get(request_type, queue_length), make_queue(**scheduling))
+                 for request_type, count in worker_groups.items()}
+    else:
+        pools = {request_type: WorkerPool(count, queue=make_queue(**scheduling))
+                 for request_type, count in worker_groups.items()}
+    return pools, dict(pools)
+
+
+# Build and run the config.json scenario on the virtual clock
+def run_scenario(config, log_capacity=0, spill_path=None, realtime=False, speed=1.0, collect_metrics=False,
+                 trace_path=None, requests_path=None):
+    engine = EventEngine()
+    log = EventLog(log_capacity, spill_path, virtual_time=True) if log_capacity or spill_path else None
+    simulation = simulation_from_config(engine, config, log)
+    if collect_metrics:
+        simulation.metrics = MetricsCollector(simulation.process_times, servers=simulation.total_workers())
+    if requests_path:
+        simulation.ledger = RequestLedger()
+    trace = TraceWriter(trace_path, simulation) if trace_path else None
+    if trace:
+        simulation.listeners.append(trace)
+    client = client_from_config(simulation, config)
+    if client is not None:
+        feed_arrivals(engine, arrivals_from_config(config, bounded=True), client.add_request)
+    else:
+        simulation.feed(arrivals_from_config(config, bounded=True))
+    if realtime:
+        engine.run_realtime(speed=speed)
+    else:
+        engine.run()
+    if log is not None:
+        log.close()
+    if trace:
+        trace.close()
+    if requests_path:
+        simulation.ledger.write_csv(requests_path)
+    return simulation
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import deque
+
+# Event kinds recorded by the simulators
+ENQUEUE = "enqueue"
+BLOCK = "block"
+START = "start"
+FINISH = "finish"
+
+
+# Display name of a request, e.g. "Read12"; only built when a record is actually shown
+def request_name(request_type, request_id):
+    return f"{request_type.capitalize()}{request_id}"
+
+
+# One structured log entry; nothing is formatted until the entry is displayed
+class EventRecord:
+    __slots__ = ("seq", "kind", "request_id", "request_type", "timestamp", "detail")
+
+    def __init__(self, seq, kind, request_id, request_type, timestamp, detail=None):
+        self.seq = seq
+        self.kind = kind
+        self.request_id = request_id
+        self.request_type = request_type
+        self.timestamp = timestamp
+        self.detail = detail  # Processing time for START records, "shed" for BLOCK records refused by admission control
+
+    def format(self, virtual_time=False):
+        if virtual_time:
+            stamp = f"[t={self.timestamp:.3f}]"
+        else:
+            stamp = time.strftime("[%H:%M:%S]", time.localtime(self.timestamp))
+        name = request_name(self.request_type, self.request_id)
+        if self.kind == ENQUEUE:
+            return f"{stamp} Request '{name}' added to the queue."
+        if self.kind == BLOCK:
+            if self.detail == "shed":
+                return f"{stamp} Admission control shed request '{name}'."
+            return f"{stamp} Queue is full! Request '{name}' blocked."
+        if self.kind == START:
+            if self.detail is None:
+                return f"{stamp} Processing '{name}'..."
+            return f"{stamp} Processing '{name}' (time: {self.detail}s)..."
+        return f"{stamp} '{name}' processed."
+
+
+# Fixed-capacity ring buffer of EventRecords. Old records fall off the front; with spill_path set
+# every record is also appended to a CSV file so the full history is kept on disk.
+class EventLog:
+    def __init__(self, capacity=1000, spill_path=None, virtual_time=False):
+        self.records = deque(maxlen=capacity)
+        self.total = 0  # Records ever appended; also the seq of the newest record
+        self._lock = threading.Lock()  # Keeps seq order and buffer order identical across worker threads
+        self.virtual_time = virtual_time
+        self.spill = open(spill_path, "w", buffering=1 << 16) if spill_path else None
+        if self.spill:
+            self.spill.write("seq,kind,request_type,request_id,timestamp,detail\n")
+
+    def append(self, kind, request_id, request_type, timestamp, detail=None):
+        with self._lock:
+            seq = self.total + 1
+            self.records.append(EventRecord(seq, kind, request_id, request_type, timestamp, detail))
+            self.total = seq
+            if self.spill:
+                self.spill.write(f"{seq},{kind},{request_type},{request_id},{timestamp},{'' if detail is None else detail}\n")
+
+    def __len__(self):
+        return len(self.records)
+
+    def tail(self, count):
+        records = list(self.records)
+        return records[-count:] if count else []
+
+    def since(self, seq, limit=None):
+        # Records appended after `seq` (at most the newest `limit`), oldest first
+        records = list(self.records)  # Snapshot; copying a deque is atomic with respect to appends
+        new = records[-1].seq - seq if records else 0
+        if new <= 0:
+            return []
+        if limit is not None:
+            new = min(new, limit)
+        return records[-new:]
+
+    def lines(self, count=None):
+        records = list(self.records) if count is None else self.tail(count)
+        return [record.format(self.virtual_time) for record in records]
+
+    def close(self):
+        if self.spill:
+            self.spill.close()
+            self.spill = None
@@ -0,0 +1,370 @@
+import threading
+import time
+import tkinter as tk
+from collections import Counter, deque
+from queue import SimpleQueue
+
+from admission import format_admission
+from event_log import BLOCK
+from instrumentation import ProfileToggle, SamplingProfiler, StatsDumper, format_delta, snapshot_delta
+from metrics import format_snapshot
+
+
+# Log view that appends only the records added since the last refresh and trims old lines from the top,
+# instead of clearing and re-inserting the whole Text widget every tick
+class LogView:
+    def __init__(self, text_widget, log, max_lines, highlight_blocked=False):
+        self.text = text_widget
+        self.log = log
+        self.max_lines = max_lines
+        self.highlight_blocked = highlight_blocked
+        self.shown_seq = 0  # seq of the newest record on screen
+        self.line_count = 0
+        if highlight_blocked:
+            self.text.tag_config("red", foreground="red")
+
+    def reset(self, log):
+        # Show a different log from scratch (e.g. after a replay jump)
+        self.log = log
+        self.shown_seq = 0
+        self.line_count = 0
+        self.text.config(state="normal")
+        self.text.delete(1.0, tk.END)
+        self.text.config(state="disabled")
+
+    def refresh(self):
+        # Nothing logged since the last frame: skip the widget entirely
+        if self.log.total == self.shown_seq:
+            return False
+        records = self.log.since(self.shown_seq, self.max_lines)
+        if not records:
+            return False
+
+        self.text.config(state="normal")
+        if len(records) >= self.max_lines:
+            # The new records alone fill the view
+            self.text.delete(1.0, tk.END)
+            self.line_count = 0
+        virtual_time = self.log.virtual_time  # Replay, clients and loopback logs are stamped in simulated seconds
+        for record in records:
+            text = record.format(virtual_time)
+            line = text if self.line_count == 0 else "\n" + text
+            if self.highlight_blocked and record.kind == BLOCK:
+                self.text.insert(tk.END, line, "red")
+            else:
+                self.text.insert(tk.END, line)
+            self.line_count += 1
+        excess = self.line_count - self.max_lines
+        if excess > 0:
+            self.text.delete(1.0, f"{excess + 1}.0")
+            self.line_count -= excess
+        self.text.config(state="disabled")
+
+        self.shown_seq = records[-1].seq
+        return True
+
+
+# Single frame loop on the Tk main thread. Simulator threads never touch Tk: they only call
+# request() to mark the view dirty or post() an event for the next frame. At most one repaint
+# runs per frame, however many events arrive in between.
+class RenderScheduler:
+    def __init__(self, root, render, frame_ms=50, instruments=None):
+        self.root = root
+        self.render = render  # Called on the main thread as render(events)
+        self.frame_ms = frame_ms
+        self.dirty = threading.Event()
+        self.events = SimpleQueue()
+        self.instruments = instruments  # Optional instrumentation.Instruments: render time and after() lag
+        self._job = None
+        self._due = None  # perf_counter time the pending tick was asked for
+
+    def start(self):
+        if self._job is None:
+            self.dirty.set()  # Paint the first frame
+            self._job = self.root.after(0, self._tick)
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    def request(self):
+        # Thread-safe: repaint on the next frame
+        self.dirty.set()
+        if self.instruments is not None:
+            self.instruments.count("render.requests")
+
+    def post(self, event):
+        # Thread-safe: hand an event to the next frame's render call
+        self.events.put(event)
+        self.dirty.set()
+        if self.instruments is not None:
+            self.instruments.count("render.requests")
+
+    def _tick(self):
+        instruments = self.instruments
+        if instruments is not None:
+            started = time.perf_counter()
+            if self._due is not None:
+                instruments.add_time("after.lag", max(0.0, started - self._due))
+        if self.dirty.is_set():
+            self.dirty.clear()
+            events = []
+            while not self.events.empty():
+                events.append(self.events.get_nowait())
+            self.render(events)
+            if instruments is not None:
+                instruments.add_time("render", time.perf_counter() - started)
+        self._job = self.root.after(self.frame_ms, self._tick)
+        if instruments is not None:
+            self._due = time.perf_counter() + self.frame_ms / 1000
+
+
+# One frame-clock ticker for every in-flight request sprite. Positions are interpolated from elapsed
+# time, so a late frame never slows an animation down. Canvas rectangles are reused from a pool, and
+# at most `max_sprites` are shown at once; launches beyond that are only counted in `overflow`.
+class SpriteAnimator:
+    def __init__(self, root, canvas, size=50, speed=400, frame_ms=20, max_sprites=40, max_parked=10,
+                 counter_pos=None, instruments=None):
+        self.root = root
+        self.instruments = instruments  # Optional instrumentation.Instruments: time per animation frame
+        self.canvas = canvas
+        self.size = size
+        self.speed = speed  # Pixels per second
+        self.frame_ms = frame_ms
+        self.max_sprites = max_sprites
+        self.free = []  # Hidden canvas items ready for reuse
+        self.active = []  # [item, x0, y0, x1, y1, start time, duration, park, on_done]
+        self.parked = deque()  # Sprites left on screen at their destination (e.g. the Blocked Area)
+        self.max_parked = max_parked
+        self.overflow = 0
+        self.counter = canvas.create_text(*counter_pos, text="", font=("Arial", 12)) if counter_pos else None
+        self._job = None
+
+    def launch(self, color, start, end, park=False, on_done=None):
+        if self.instruments is not None:
+            self.instruments.count("animation.launched")
+        if len(self.active) + len(self.parked) >= self.max_sprites:
+            self.overflow += 1
+            if self.instruments is not None:
+                self.instruments.count("animation.overflow")
+            self._update_counter()
+            if on_done:
+                on_done()
+            return
+        item = self.free.pop() if self.free else self.canvas.create_rectangle(0, 0, 0, 0)
+        self.canvas.itemconfig(item, fill=color, state="normal")
+        self.canvas.coords(item, start[0], start[1], start[0] + self.size, start[1] + self.size)
+        distance = ((end[0] - start[0]) ** 2 + (end[1] - start[1]) ** 2) ** 0.5
+        self.active.append([item, start[0], start[1], end[0], end[1], time.perf_counter(),
+                            max(distance / self.speed, 1e-6), park, on_done])
+        if self._job is None:
+            self._job = self.root.after(self.frame_ms, self._tick)
+
+    def _tick(self):
+        now = time.perf_counter()
+        size = self.size
+        still_moving = []
+        finished = []
+        for sprite in self.active:
+            item, x0, y0, x1, y1, started, duration = sprite[:7]
+            progress = (now - started) / duration
+            if progress >= 1:
+                progress = 1
+                finished.append(sprite)
+            else:
+                still_moving.append(sprite)
+            x = x0 + (x1 - x0) * progress
+            y = y0 + (y1 - y0) * progress
+            self.canvas.coords(item, x, y, x + size, y + size)
+        self.active = still_moving
+        for item, *_, park, on_done in finished:
+            if park:
+                self._park(item)
+            else:
+                self._release(item)
+            if on_done:
+                on_done()
+        self._job = self.root.after(self.frame_ms, self._tick) if self.active else None
+        if self.instruments is not None:
+            self.instruments.add_time("animation.frame", time.perf_counter() - now)
+
+    def _park(self, item):
+        self.parked.append(item)
+        if len(self.parked) > self.max_parked:
+            self._release(self.parked.popleft())
+
+    def _release(self, item):
+        self.canvas.itemconfig(item, state="hidden")
+        self.free.append(item)
+
+    def _update_counter(self):
+        if self.counter is not None:
+            self.canvas.itemconfig(self.counter, text=f"+{self.overflow} not animated")
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+
+# Queue visualization that only touches what changed. Up to the number of slots that fit in
+# `max_width` it draws one slot per queue position and recolors only slots whose request type changed;
+# beyond that it switches to a single stacked occupancy bar per request type, so the cost of a frame
+# does not depend on queue_length.
+class QueueView:
+    def __init__(self, canvas, x, y, capacity, colors, slot_size=40, pitch=50, max_width=800):
+        self.canvas = canvas
+        self.capacity = capacity
+        self.colors = colors
+        self.aggregated = capacity * pitch > max_width
+        if not self.aggregated:
+            self.slots = [canvas.create_rectangle(x + i * pitch, y, x + i * pitch + slot_size, y + slot_size,
+                                                  outline="orange", fill="white")
+                          for i in range(capacity)]
+            self.shown = [None] * capacity  # Request type currently drawn in each slot
+            self.filled = 0
+        else:
+            self.x = x
+            self.y = y
+            self.width = max_width - (pitch - slot_size)
+            self.height = slot_size
+            canvas.create_rectangle(x, y, x + self.width, y + slot_size, outline="orange", fill="white")
+            self.bars = {request_type: canvas.create_rectangle(x, y, x, y + slot_size, fill=color, width=0)
+                         for request_type, color in colors.items()}
+            self.label = canvas.create_text(x + self.width / 2, y + slot_size + 12, text="", font=("Arial", 10))
+            self.shown_counts = None
+
+    def update(self, request_types):
+        # request_types: types of the waiting requests, in queue order
+        if self.aggregated:
+            self._update_bars(Counter(request_types))
+        else:
+            self._update_slots(request_types)
+
+    def _update_slots(self, request_types):
+        shown = self.shown
+        count = 0
+        # More waiting requests than slots (partition bounds adding up past capacity): show the first ones
+        for i, request_type in enumerate(request_types[:len(shown)]):
+            if shown[i] != request_type:
+                self.canvas.itemconfig(self.slots[i], fill=self.colors.get(request_type, "white"))
+                shown[i] = request_type
+            count = i + 1
+        for i in range(count, self.filled):
+            self.canvas.itemconfig(self.slots[i], fill="white")
+            shown[i] = None
+        self.filled = count
+
+    def _update_bars(self, counts):
+        if counts == self.shown_counts:
+            return
+        self.shown_counts = counts
+        total = sum(counts.values())
+        scale = self.width / max(self.capacity, total)
+        left = self.x
+        for request_type, bar in self.bars.items():
+            right = left + scale * counts.get(request_type, 0)
+            self.canvas.coords(bar, left, self.y, right, self.y + self.height)
+            left = right
+        parts = ", ".join(f"{request_type} {counts.get(request_type, 0)}" for request_type in self.bars)
+        self.canvas.itemconfig(self.label, text=f"{total}/{self.capacity} queued ({parts})")
+
+
+# Canvas text panel showing a MetricsCollector snapshot, recomputed at most every `interval` seconds
+class StatsPanel:
+    def __init__(self, canvas, x, y, metrics, clock=time.time, interval=0.5, admission=None):
+        self.canvas = canvas
+        self.metrics = metrics
+        self.admission = admission  # Optional admission.AdmissionStats, shown as a goodput line
+        self.clock = clock
+        self.interval = interval
+        self.next_refresh = 0.0
+        self.text = canvas.create_text(x, y, text="", anchor="nw", font=("Courier", 10))
+
+    def reset(self, metrics, admission=None):
+        self.metrics = metrics
+        self.admission = admission
+        self.next_refresh = 0.0
+
+    def refresh(self):
+        now = self.clock()
+        if now < self.next_refresh:
+            return
+        self.next_refresh = now + self.interval
+        snapshot = self.metrics.snapshot(now)
+        text = format_snapshot(snapshot)
+        if self.admission is not None:
+            text += "\n" + format_admission(self.admission.snapshot(snapshot["elapsed"]))
+        self.canvas.itemconfig(self.text, text=text)
+
+
+# Live instrumentation overlay: FPS, events/sec and per-frame costs, refreshed on its own after() loop
+# so it keeps updating when nothing else repaints. `events` returns the total simulator events so far.
+class InstrumentOverlay:
+    def __init__(self, root, canvas, x, y, instruments, events=None, interval_ms=500):
+        self.root = root
+        self.canvas = canvas
+        self.instruments = instruments
+        self.events = events
+        self.interval_ms = interval_ms
+        self.text = canvas.create_text(x, y, text="", anchor="nw", font=("Courier", 10), fill="purple")
+        self.visible = True
+        self.previous = None
+        self.previous_events = 0
+        self._job = None
+
+    def start(self):
+        if self._job is None:
+            self._job = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.canvas.itemconfig(self.text, state="normal" if self.visible else "hidden")
+
+    def _tick(self):
+        current = self.instruments.snapshot()
+        events = None
+        if self.events is not None:
+            total = self.events()
+            events = total - self.previous_events
+            self.previous_events = total
+        if self.visible:
+            self.canvas.itemconfig(self.text, text=format_delta(snapshot_delta(current, self.previous), events))
+        self.previous = current
+        self._job = self.root.after(self.interval_ms, self._tick)
+
+
+# Everything the instrumentation layer adds to an App: the overlay, the periodic stats dump (when
+# settings["dump_interval"] is set) and runtime profiler toggles bound to F8 (overlay), F9 (cProfile of the
+# Tk thread) and F10 (sampling profiler over all threads). `settings` is config.json's "instrumentation".
+class InstrumentationControls:
+    def __init__(self, root, canvas, x, y, instruments, events=None, settings=None):
+        settings = settings or {}
+        self.overlay = InstrumentOverlay(root, canvas, x, y, instruments, events)
+        self.dumper = None
+        if settings.get("dump_interval"):
+            self.dumper = StatsDumper(instruments, settings["dump_interval"], settings.get("dump_path"), events)
+            self.dumper.start()
+        self.profiler = ProfileToggle(settings.get("profile_path", "gui.prof"))
+        self.sampler = SamplingProfiler(settings.get("sample_interval", 0.005),
+                                        settings.get("samples_path", "samples.folded"))
+        root.bind("<F8>", lambda event: self.overlay.toggle())
+        root.bind("<F9>", lambda event: self.profiler.toggle())
+        root.bind("<F10>", lambda event: self.sampler.toggle())
+        self.overlay.start()
+
+    def stop(self):
+        self.overlay.stop()
+        if self.dumper is not None:
+            self.dumper.stop()
+        # Stopping a running capture writes its report
+        if self.profiler.active:
+            self.profiler.toggle()
+        if self.sampler.active:
+            self.sampler.toggle()
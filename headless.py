@@ -0,0 +1,141 @@
+import argparse
+import json
+import sys
+import time
+
+from admission import CLIENTS, LIMITERS, format_admission
+from event_engine import run_scenario
+from metrics import format_snapshot
+from scheduling import DISCIPLINES
+from sim_config import DEFAULT_CONFIG_PATH, load_config
+from topology import BALANCERS, run_topology
+
+# Headless batch mode: run a config.json scenario without tkinter or PIL and print a results summary.
+# Usage: python headless.py [--config config.json] [--trace arrivals.jsonl] [--discipline sjf] [--log 20] [--spill events.csv] [--record run.trace] [--requests requests.csv] [--json] [--realtime --speed 10]
+# A config with a "topology" section runs the multi-node topology instead (see topology.py), and one with a
+# "clients" section (or --clients N) runs the coroutine-per-client asyncio simulator (see async_sim.py).
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the server queue simulation without a GUI.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="scenario file (default: config.json)")
+    parser.add_argument("--trace", help="replay a JSONL/CSV arrival trace instead of the config's arrival source")
+    parser.add_argument("--discipline", choices=DISCIPLINES, help="override the config's queue scheduling discipline")
+    parser.add_argument("--log", type=int, default=0, metavar="N", help="print the last N log entries after the summary")
+    parser.add_argument("--spill", help="write the full event history to this CSV file")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    parser.add_argument("--record", metavar="TRACE", help="record every event to a binary trace for GUI replay")
+    parser.add_argument("--requests", metavar="CSV", help="write every finished request's timestamps to this CSV file")
+    parser.add_argument("--client", choices=CLIENTS, help="override the admission client policy (drop, block, retry)")
+    parser.add_argument("--limiter", choices=LIMITERS, help="override the admission limiter (none, token_bucket, red)")
+    parser.add_argument("--balancer", choices=BALANCERS, help="override the topology's load balancer policy")
+    parser.add_argument("--clients", type=int, metavar="N", help="simulate N concurrent clients with the asyncio simulator")
+    parser.add_argument("--duration", type=float, help="simulated seconds for --clients runs")
+    parser.add_argument("--profile", metavar="PATH", help="run under cProfile, print the top functions and save the stats to PATH")
+    parser.add_argument("--no-metrics", action="store_true", help="skip latency and utilization metrics")
+    parser.add_argument("--realtime", action="store_true", help="play back in wall-clock time instead of as fast as possible")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed multiplier for --realtime")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile:
+        from instrumentation import ProfileToggle  # cProfile and pstats only when profiling
+
+        profiler = ProfileToggle(args.profile)
+        profiler.toggle()
+        try:
+            run(args)
+        finally:
+            profiler.toggle()
+    else:
+        run(args)
+
+
+def run(args):
+    config = load_config(args.config)
+    if args.trace:
+        config["arrivals"] = {"kind": "trace", "path": args.trace}
+    if args.discipline:
+        config["discipline"] = args.discipline
+    for option in ("client", "limiter"):
+        if getattr(args, option):
+            config["admission"] = dict(config.get("admission") or {}, **{option: getattr(args, option)})
+
+    if "topology" in config:
+        run_topology_summary(config, args)
+        return
+    if args.clients or "clients" in config:
+        run_clients_summary(config, args)
+        return
+
+    started = time.perf_counter()
+    simulation = run_scenario(config, log_capacity=args.log, spill_path=args.spill, realtime=args.realtime, speed=args.speed,
+                              collect_metrics=not args.no_metrics, trace_path=args.record, requests_path=args.requests)
+    summary = simulation.summary()
+    if simulation.metrics is not None:
+        summary["metrics"] = simulation.metrics.snapshot(simulation.engine.now)
+    if simulation.ledger is not None:
+        summary["requests"] = simulation.ledger.summary()
+    if simulation.admission is not None:
+        summary["admission"] = simulation.admission.snapshot()
+    summary["wall_time"] = time.perf_counter() - started
+
+    print_summary(summary, args.json)
+    if args.log:
+        print("\n".join(simulation.log.lines()))
+
+
+def run_topology_summary(config, args):
+    if args.balancer:
+        config["topology"] = dict(config["topology"], balancer=args.balancer)
+    started = time.perf_counter()
+    topology = run_topology(config, collect_metrics=not args.no_metrics)
+    summary = topology.summary()
+    for node in topology.nodes:
+        if node.metrics is not None:
+            summary["nodes"][node.name]["metrics"] = node.metrics.snapshot(topology.engine.now)
+    summary["wall_time"] = time.perf_counter() - started
+    print_summary(summary, args.json)
+
+
+def run_clients_summary(config, args):
+    from async_sim import run_async  # asyncio is a large share of startup; only clients mode needs it
+
+    started = time.perf_counter()
+    simulation = run_async(config, args.clients, args.duration, speed=args.speed if args.realtime else None,
+                           log_capacity=args.log, trace_path=args.record)
+    summary = simulation.summary()
+    if not args.no_metrics:
+        summary["metrics"] = simulation.metrics.snapshot(summary["sim_time"])
+    summary["wall_time"] = time.perf_counter() - started
+    print_summary(summary, args.json)
+    if args.log:
+        print("\n".join(simulation.log.lines()))
+
+
+def print_summary(summary, as_json=False):
+    if as_json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+        return
+    for key, value in summary.items():
+        if key == "metrics":
+            print(format_snapshot(value))
+        elif key == "admission":
+            print(format_admission(value))
+        elif key == "requests":
+            for request_type, stats in value.items():
+                print(f"{request_type:>12}: n={stats['count']} mean={stats['mean']:.3f} p50={stats['p50']:.3f} "
+                      f"p99={stats['p99']:.3f} max={stats['max']:.3f} (exact)")
+        elif key == "nodes":
+            for name, node_summary in value.items():
+                print(f"\n[{name}]")
+                print_summary(node_summary)
+        else:
+            print(f"{key:>12}: {value:.4f}" if isinstance(value, float) else f"{key:>12}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import cProfile
+import json
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+# Opt-in instrumentation for the demos and the GUI. Components take an optional Instruments and do no
+# bookkeeping at all when it is None. Timers used on the hot paths:
+#   engine.advance   time the demos' ServerSimulator spent running events, once per frame
+#   render           time spent in the render callback (update_display), once per painted frame
+#   after.lag        how late the RenderScheduler tick fired after its Tk after() deadline (callback backlog)
+#   animation.frame  time spent moving sprites, once per animation frame
+# and counters:
+#   requests.enqueued, requests.blocked, requests.shed   arrival outcomes in the demos' ServerSimulator
+#   render.requests      repaints asked for by the simulator or client threads; over the render count this is the coalescing
+#   animation.launched, animation.overflow               sprites started, and launches over max_sprites
+# Enabled by an "instrumentation" section in config.json, e.g.
+#   "instrumentation": {"dump_interval": 10, "dump_path": "stats.jsonl", "profile_path": "gui.prof",
+#                       "samples_path": "samples.folded", "sample_interval": 0.005}
+
+
+class Timer:
+    __slots__ = ("count", "total", "max", "lock")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+
+class Instruments:
+    def __init__(self):
+        self.counters = {}
+        self.timers = {}
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def timer(self, name):
+        timer = self.timers.get(name)
+        if timer is None:
+            with self.lock:
+                timer = self.timers.setdefault(name, Timer())
+        return timer
+
+    def add_time(self, name, seconds):
+        self.timer(name).add(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            counters = dict(self.counters)
+            timers = list(self.timers.items())
+        return {
+            "uptime": time.perf_counter() - self.started,
+            "counters": counters,
+            "timers": {name: {"count": timer.count, "total": timer.total, "max": timer.max} for name, timer in timers}
+        }
+
+
+# Change between two snapshots: per-timer count, total, mean, and counter deltas, over `seconds`
+def snapshot_delta(current, previous):
+    seconds = current["uptime"] - (previous["uptime"] if previous else 0.0)
+    timers = {}
+    for name, stats in current["timers"].items():
+        before = previous["timers"].get(name) if previous else None
+        count = stats["count"] - (before["count"] if before else 0)
+        total = stats["total"] - (before["total"] if before else 0.0)
+        timers[name] = {"count": count, "total": total, "mean": total / count if count else 0.0, "max": stats["max"]}
+    counters = {name: value - (previous["counters"].get(name, 0) if previous else 0)
+                for name, value in current["counters"].items()}
+    return {"seconds": seconds, "timers": timers, "counters": counters}
+
+
+# Text for the GUI overlay and the stats dump, from a snapshot_delta and the number of simulator events in it
+def format_delta(delta, events=None):
+    seconds = delta["seconds"] or 1e-9
+    timers = delta["timers"]
+    empty = {"count": 0, "total": 0.0, "mean": 0.0, "max": 0.0}
+    render = timers.get("render", empty)
+    lag = timers.get("after.lag", empty)
+    animation = timers.get("animation.frame", empty)
+    engine = timers.get("engine.advance", empty)
+    counters = delta["counters"]
+    lines = [
+        f"FPS {render['count'] / seconds:5.1f}  render {render['mean'] * 1000:6.2f} ms  "
+        f"after lag {lag['mean'] * 1000:6.2f} ms  anim {animation['mean'] * 1000:5.2f} ms/frame",
+    ]
+    if events is not None:
+        lines[0] = f"events/s {events / seconds:7.1f}  " + lines[0]
+    if engine["count"]:
+        lines.append(f"engine {engine['mean'] * 1000:6.2f} ms/frame (max {engine['max'] * 1000:.1f})")
+    if counters:
+        enqueued = counters.get("requests.enqueued", 0)
+        refused = counters.get("requests.blocked", 0) + counters.get("requests.shed", 0)
+        lines.append(f"enqueued {enqueued / seconds:6.1f}/s  refused {refused / seconds:6.1f}/s  "
+                     f"{counters.get('render.requests', 0) / max(render['count'], 1):5.1f} repaint requests/frame  "
+                     f"sprite overflow {counters.get('animation.overflow', 0)}")
+    return "\n".join(lines)
+
+
+# Writes a JSON line with the instrument deltas every `interval` seconds, to `path` or stderr
+class StatsDumper:
+    def __init__(self, instruments, interval=10.0, path=None, events=None):
+        self.instruments = instruments
+        self.interval = interval
+        self.path = path
+        self.events = events  # Optional callable returning the total simulator events so far
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        previous = None
+        previous_events = 0
+        output = open(self.path, "a") if self.path else sys.stderr
+        try:
+            while not self.stopped.wait(self.interval):
+                current = self.instruments.snapshot()
+                record = snapshot_delta(current, previous)
+                record["time"] = time.time()
+                if self.events is not None:
+                    total = self.events()
+                    record["events"] = total - previous_events
+                    previous_events = total
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+                previous = current
+        finally:
+            if self.path:
+                output.close()
+
+    def stop(self):
+        self.stopped.set()
+
+
+# cProfile capture toggled at runtime. cProfile only sees the thread that enabled it: in the GUI that is the
+# Tk main thread, so this answers "where does the GUI spend its time"; SamplingProfiler covers the workers.
+class ProfileToggle:
+    def __init__(self, path="profile.prof", top=25, stream=sys.stderr):
+        self.path = path
+        self.top = top
+        self.stream = stream
+        self.profile = None
+
+    @property
+    def active(self):
+        return self.profile is not None
+
+    def toggle(self):
+        if self.profile is None:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+            print(f"cProfile started (writes {self.path} when stopped)", file=self.stream)
+        else:
+            self.profile.disable()
+            self.profile.dump_stats(self.path)
+            pstats.Stats(self.profile, stream=self.stream).sort_stats("cumulative").print_stats(self.top)
+            self.profile = None
+        return self.active
+
+
+# Statistical profiler: samples every other thread's stack at `interval` and counts where they are.
+# Stopping prints the hottest leaf functions and writes the stacks in folded format (one "a;b;c count" line
+# per distinct stack, the input of flame graph tools) to `path`.
+class SamplingProfiler:
+    def __init__(self, interval=0.005, path="samples.folded", top=25, stream=sys.stderr):
+        self.interval = interval
+        self.path = path
+        self.top = top
+        self.stream = stream
+        self.stacks = Counter()
+        self.samples = 0
+        self.stopped = None
+        self.thread = None
+
+    @property
+    def active(self):
+        return self.thread is not None
+
+    def toggle(self):
+        if self.thread is None:
+            self.stacks.clear()
+            self.samples = 0
+            self.stopped = threading.Event()
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+            print(f"sampling profiler started every {self.interval * 1000:g} ms", file=self.stream)
+        else:
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
+            self._report()
+        return self.active
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self.stopped.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def _report(self):
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        print(f"{self.samples} samples", file=self.stream)
+        for leaf, count in leaves.most_common(self.top):
+            print(f"{count / total:7.1%}  {leaf}", file=self.stream)
+        if self.path:
+            with open(self.path, "w") as file:
+                for stack, count in self.stacks.items():
+                    file.write(f"{stack} {count}\n")
@@ -0,0 +1,263 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from arrivals import arrivals_from_config
+from async_sim import AsyncSimulationThread, simulation_from_config
+from event_engine import run_scenario
+from event_log import EventLog
+from metrics import LatencyHistogram, format_snapshot
+from sim_config import DEFAULT_CONFIG_PATH, load_config
+
+# Real localhost TCP mode: measure an actual asyncio server instead of simulating one.
+# The server accepts newline-delimited "<id> <type>" requests and answers "<id> OK" once the request has been
+# handled, "<id> BUSY" when the bounded work queue (queue_length) is full, or "<id> ERR" for an unknown type.
+# Handlers spend their type's configured cost (read_time, write_time, forward_time, divided by speed) awaiting,
+# the way an I/O-bound handler would, with `workers` of them in parallel; the queue and counters are the
+# AsyncSimulation ones, so the log, metrics and GUI consumers work unchanged.
+# The load generator replays the configured arrival source (requests_sequence by default) over a pool of
+# connections, pipelining up to `pipeline` outstanding requests per connection.
+# Usage: python loopback.py [--config config.json] [--speed 10] [--connections 4] [--pipeline 16] [--compare]
+#        python loopback.py --serve --port 8765            (server only)
+#        python loopback.py --target 127.0.0.1:8765        (load generator only)
+
+RESPONSES = {True: b"OK", False: b"BUSY"}
+
+
+# TCP front end for an AsyncSimulation: every request line becomes a simulation.request() task
+class LoopbackServer:
+    def __init__(self, simulation, backlog=100):
+        self.simulation = simulation
+        self.backlog = backlog  # Listen backlog: the bound on connections waiting to be accepted
+        self.server = None
+        self.port = None
+        self.connections = 0
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.simulation.start()
+        self.server = await asyncio.start_server(self._connection, host, port, backlog=self.backlog)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def _connection(self, reader, writer):
+        self.connections += 1
+        tasks = set()
+        try:
+            async for line in reader:
+                fields = line.split()
+                if len(fields) != 2 or fields[1].decode() not in self.simulation.process_times:
+                    writer.write(b"%s ERR\n" % (fields[0] if fields else b"?"))
+                    continue
+                task = asyncio.create_task(self._serve(fields[0], fields[1].decode(), writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+            self.connections -= 1
+
+    async def _serve(self, request_id, request_type, writer):
+        accepted = await self.simulation.request(request_type)
+        if not writer.is_closing():
+            writer.write(b"%s %s\n" % (request_id, RESPONSES[accepted]))
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        await self.simulation.stop()
+
+
+# One pooled connection: requests sent and not yet answered, bounded by the pipeline depth
+class Connection:
+    __slots__ = ("reader", "writer", "pending", "slots", "task")
+
+    def __init__(self, reader, writer, pipeline):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}  # request id -> (request_type, send time)
+        self.slots = asyncio.Semaphore(pipeline)
+        self.task = None
+
+
+# Open-loop load generator: sends each arrival at its (speed-scaled) time on the least-loaded pooled connection
+class LoadGenerator:
+    def __init__(self, host="127.0.0.1", port=8765, connections=4, pipeline=16, speed=1.0):
+        self.host = host
+        self.port = port
+        self.connections = connections
+        self.pipeline = pipeline
+        self.speed = speed
+        self.latency = {}  # request_type -> LatencyHistogram of response times, in model seconds
+        self.sent = 0
+        self.ok = 0
+        self.busy = 0
+        self.errors = 0
+        self.late = 0.0  # Total time sends ran behind schedule (pipelines full or the generator overloaded)
+        self.elapsed = 0.0
+
+    async def run(self, arrivals):
+        loop = asyncio.get_running_loop()
+        pool = []
+        for _ in range(self.connections):
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            connection = Connection(reader, writer, self.pipeline)
+            connection.task = asyncio.create_task(self._responses(connection))
+            pool.append(connection)
+        start = loop.time()
+        try:
+            for request_id, (when, request_type) in enumerate(arrivals, 1):
+                delay = start + when / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.late -= delay
+                connection = min(pool, key=lambda candidate: len(candidate.pending))
+                await connection.slots.acquire()
+                connection.pending[request_id] = (request_type, loop.time())
+                connection.writer.write(b"%d %s\n" % (request_id, request_type.encode()))
+                self.sent += 1
+                await connection.writer.drain()
+            # Every slot back means every response is in
+            for connection in pool:
+                for _ in range(self.pipeline):
+                    await connection.slots.acquire()
+        finally:
+            self.elapsed = (loop.time() - start) * self.speed
+            for connection in pool:
+                connection.task.cancel()
+                connection.writer.close()
+            await asyncio.gather(*(connection.task for connection in pool), return_exceptions=True)
+
+    async def _responses(self, connection):
+        loop = asyncio.get_running_loop()
+        async for line in connection.reader:
+            request_id, status = line.split()
+            request_type, sent = connection.pending.pop(int(request_id))
+            connection.slots.release()
+            if status == b"OK":
+                self.ok += 1
+                histogram = self.latency.get(request_type)
+                if histogram is None:
+                    histogram = self.latency[request_type] = LatencyHistogram()
+                histogram.record((loop.time() - sent) * self.speed)
+            elif status == b"BUSY":
+                self.busy += 1
+            else:
+                self.errors += 1
+
+    def summary(self):
+        answered = self.ok + self.busy
+        return {
+            "sent": self.sent,
+            "ok": self.ok,
+            "busy": self.busy,
+            "errors": self.errors,
+            "reject_rate": self.busy / answered if answered else 0.0,
+            "throughput": self.ok / self.elapsed if self.elapsed > 0 else 0.0,
+            "schedule_lag": self.late * self.speed,
+            "latency": {request_type: histogram.summary() for request_type, histogram in self.latency.items()}
+        }
+
+
+# Serve and load-generate in one process over loopback; returns (server, generator) once every response is in
+async def run_loopback(config, speed=1.0, connections=4, pipeline=16, log=None):
+    server = LoopbackServer(simulation_from_config(config, speed, log), backlog=config["queue_length"])
+    await server.start()
+    generator = LoadGenerator(port=server.port, connections=connections, pipeline=pipeline, speed=speed)
+    try:
+        await generator.run(arrivals_from_config(config, bounded=True))
+    finally:
+        await server.close()
+    return server, generator
+
+
+# The loopback run on a background thread for the Tk GUI, which shows the server's measured queue and rejections
+class LoopbackThread(AsyncSimulationThread):
+    def __init__(self, config, speed=1.0, connections=4, pipeline=16, log_capacity=1000):
+        self.attach(simulation_from_config(config, speed, EventLog(log_capacity, virtual_time=True), thread_safe=True))
+        self.config = config
+        self.connections = connections
+        self.pipeline = pipeline
+        self.generator = None
+
+    async def main(self):
+        server = LoopbackServer(self.simulation, backlog=self.config["queue_length"])
+        await server.start()
+        self.generator = LoadGenerator(port=server.port, connections=self.connections, pipeline=self.pipeline,
+                                       speed=self.simulation.speed)
+        try:
+            await self.generator.run(arrivals_from_config(self.config))
+        finally:
+            await server.close()
+
+
+async def serve_forever(config, speed, host, port):
+    server = LoopbackServer(simulation_from_config(config, speed), backlog=config["queue_length"])
+    await server.start(host, port)
+    print(f"serving on {host}:{server.port}", file=sys.stderr)
+    await server.server.serve_forever()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure a real asyncio TCP server over loopback.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="scenario file (default: config.json)")
+    parser.add_argument("--speed", type=float, default=1.0, help="divide every cost and inter-arrival time by this")
+    parser.add_argument("--connections", type=int, default=4, help="pooled client connections")
+    parser.add_argument("--pipeline", type=int, default=16, help="outstanding requests allowed per connection")
+    parser.add_argument("--serve", action="store_true", help="only run the server")
+    parser.add_argument("--port", type=int, default=8765, help="port for --serve")
+    parser.add_argument("--target", metavar="HOST:PORT", help="only run the load generator against this server")
+    parser.add_argument("--compare", action="store_true", help="also run the event simulator on the same scenario")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = load_config(args.config)
+    if args.serve:
+        asyncio.run(serve_forever(config, args.speed, "127.0.0.1", args.port))
+        return
+
+    started = time.perf_counter()
+    results = {}
+    if args.target:
+        host, port = args.target.rsplit(":", 1)
+        generator = LoadGenerator(host, int(port), args.connections, args.pipeline, args.speed)
+        asyncio.run(generator.run(arrivals_from_config(config, bounded=True)))
+    else:
+        server, generator = asyncio.run(run_loopback(config, args.speed, args.connections, args.pipeline))
+        results["server"] = server.simulation.summary()
+        results["server"]["metrics"] = server.simulation.metrics.snapshot(server.simulation.now())
+    results["client"] = generator.summary()
+    if args.compare:
+        simulation = run_scenario(config, collect_metrics=True)
+        results["simulated"] = simulation.summary()
+        results["simulated"]["metrics"] = simulation.metrics.snapshot(simulation.engine.now)
+    results["wall_time"] = time.perf_counter() - started
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+    for section, values in results.items():
+        if not isinstance(values, dict):
+            print(f"{section:>12}: {values:.4f}")
+            continue
+        print(f"[{section}]")
+        for key, value in values.items():
+            if key == "metrics":
+                print(format_snapshot(value))
+            elif key == "latency":
+                for request_type, stats in value.items():
+                    print(f"{request_type:>12}: n={stats['count']} p50={stats['p50']:.3f} p99={stats['p99']:.3f}")
+            else:
+                print(f"{key:>12}: {value:.4f}" if isinstance(value, float) else f"{key:>12}: {value}")
+
+
+if __name__ == "__main__":
+    main()
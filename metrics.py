@@ -0,0 +1,194 @@
+import math
+import threading
+from array import array
+
+# Streaming latency and throughput metrics. Every metric keeps constant memory no matter how many
+# requests are recorded: histograms are fixed log-linear bucket arrays, everything else is a running sum.
+
+PERCENTILES = (50, 95, 99, 99.9)
+
+
+# HDR-style histogram: buckets are powers of two split into `sub_buckets` linear steps, so every
+# recorded value is kept to within 1/sub_buckets relative error. The buckets are allocated up front for
+# 2**MIN_EXPONENT .. 2**MAX_EXPONENT seconds (values outside are clamped to the end buckets), so recording
+# never allocates: a sparse dict kept gaining keys as rare tail values arrived.
+class LatencyHistogram:
+    MIN_EXPONENT = -16
+    MAX_EXPONENT = 32
+    __slots__ = ("sub_buckets", "buckets", "zeros", "count", "total", "min", "max")
+
+    def __init__(self, sub_buckets=64):
+        self.sub_buckets = sub_buckets
+        self.buckets = array("q", bytes(8 * (self.MAX_EXPONENT - self.MIN_EXPONENT) * sub_buckets))
+        self.zeros = 0  # Exact zeros (e.g. requests served without waiting) have no logarithm
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value):
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value <= 0:
+            self.zeros += 1
+            return
+        self.buckets[self._index(value)] += 1
+
+    def _index(self, value):
+        mantissa, exponent = math.frexp(value)  # value = mantissa * 2**exponent, 0.5 <= mantissa < 1
+        index = (exponent - self.MIN_EXPONENT) * self.sub_buckets + int((mantissa - 0.5) * 2 * self.sub_buckets)
+        return min(max(index, 0), len(self.buckets) - 1)
+
+    def _bucket_value(self, index):
+        # Midpoint of the bucket, clamped to the observed range; the end buckets may hold clamped values
+        if index == len(self.buckets) - 1:
+            return self.max
+        exponent, sub = divmod(index, self.sub_buckets)
+        exponent += self.MIN_EXPONENT
+        low = math.ldexp(0.5 + sub / (2 * self.sub_buckets), exponent)
+        high = math.ldexp(0.5 + (sub + 1) / (2 * self.sub_buckets), exponent)
+        return min(max((low + high) / 2, self.min), self.max)
+
+    def percentile(self, percent):
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = self.zeros
+        if seen >= rank:
+            return 0.0
+        # Only the buckets between the smallest and largest recorded values can be non-empty
+        for index in range(self._index(self.min) if self.min > 0 else 0, self._index(self.max) + 1):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return self._bucket_value(index)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self):
+        result = {"count": self.count, "mean": self.mean(), "max": self.max if self.count else 0.0}
+        for percent in PERCENTILES:
+            result[f"p{percent:g}".replace(".", "")] = self.percentile(percent)
+        return result
+
+
+# Collects per-request timings and time-weighted state from a simulator. The simulator calls the
+# on_* hooks with its own clock (virtual time for the event engine and the demos, loop time for the asyncio simulator).
+class MetricsCollector:
+    def __init__(self, request_types, servers=1, start_time=0.0):
+        self.servers = servers
+        self.start_time = start_time
+        self.wait = {request_type: LatencyHistogram() for request_type in request_types}
+        self.sojourn = {request_type: LatencyHistogram() for request_type in request_types}
+        self.arrived = dict.fromkeys(request_types, 0)
+        self.blocked = dict.fromkeys(request_types, 0)
+        self.completed = dict.fromkeys(request_types, 0)
+        self.queued = 0
+        self.busy = 0
+        self.queue_area = 0.0  # Integral of queue length over time
+        self.busy_area = 0.0  # Integral of busy workers over time
+        self.last_time = start_time
+
+    def _advance(self, now):
+        elapsed = now - self.last_time
+        if elapsed > 0:
+            self.queue_area += self.queued * elapsed
+            self.busy_area += self.busy * elapsed
+            self.last_time = now
+
+    def on_arrival(self, now, request_type):
+        self.arrived[request_type] += 1
+
+    def on_block(self, now, request_type):
+        self.blocked[request_type] += 1
+
+    def on_enqueue(self, now, request_type):
+        self._advance(now)
+        self.queued += 1
+
+    def on_start(self, now, request_type, waited):
+        self._advance(now)
+        self.queued -= 1
+        self.busy += 1
+        self.wait[request_type].record(waited)
+
+    def on_finish(self, now, request_type, sojourn):
+        self._advance(now)
+        self.busy -= 1
+        self.completed[request_type] += 1
+        self.sojourn[request_type].record(sojourn)
+
+    def snapshot(self, now=None):
+        # Current metrics as a plain dict; `now` extends the time-weighted averages up to that instant
+        now = self.last_time if now is None else max(now, self.last_time)
+        elapsed = now - self.start_time
+        queue_area = self.queue_area + self.queued * (now - self.last_time)
+        busy_area = self.busy_area + self.busy * (now - self.last_time)
+        arrived = sum(self.arrived.values())
+        blocked = sum(self.blocked.values())
+        completed = sum(self.completed.values())
+        waited = sum(histogram.count for histogram in self.wait.values())
+        return {
+            "elapsed": elapsed,
+            "arrived": arrived,
+            "blocked": blocked,
+            "completed": completed,
+            "block_rate": blocked / arrived if arrived else 0.0,
+            "throughput": completed / elapsed if elapsed > 0 else 0.0,
+            "utilization": busy_area / (elapsed * self.servers) if elapsed > 0 else 0.0,
+            "mean_queue_length": queue_area / elapsed if elapsed > 0 else 0.0,
+            "mean_wait": sum(histogram.total for histogram in self.wait.values()) / waited if waited else 0.0,
+            "mean_sojourn": (sum(histogram.total for histogram in self.sojourn.values()) / completed
+                             if completed else 0.0),
+            "wait": {request_type: histogram.summary() for request_type, histogram in self.wait.items()},
+            "sojourn": {request_type: histogram.summary() for request_type, histogram in self.sojourn.items()}
+        }
+
+
+# MetricsCollector for the asyncio simulator in its own thread, whose stats the GUI reads concurrently
+class ThreadSafeMetricsCollector(MetricsCollector):
+    def __init__(self, request_types, servers=1, start_time=0.0):
+        super().__init__(request_types, servers, start_time)
+        self.lock = threading.Lock()
+
+    def on_arrival(self, now, request_type):
+        with self.lock:
+            super().on_arrival(now, request_type)
+
+    def on_block(self, now, request_type):
+        with self.lock:
+            super().on_block(now, request_type)
+
+    def on_enqueue(self, now, request_type):
+        with self.lock:
+            super().on_enqueue(now, request_type)
+
+    def on_start(self, now, request_type, waited):
+        with self.lock:
+            super().on_start(now, request_type, waited)
+
+    def on_finish(self, now, request_type, sojourn):
+        with self.lock:
+            super().on_finish(now, request_type, sojourn)
+
+    def snapshot(self, now=None):
+        with self.lock:
+            return super().snapshot(now)
+
+
+# Multi-line text rendering of a snapshot, for the headless summary and the GUI stats panel
+def format_snapshot(snapshot):
+    lines = [
+        f"throughput {snapshot['throughput']:.3f}/s  utilization {snapshot['utilization']:.1%}  "
+        f"blocked {snapshot['block_rate']:.1%}  avg queue {snapshot['mean_queue_length']:.2f}",
+        f"{'sojourn':<8} {'n':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'p999':>8}"
+    ]
+    for request_type, stats in snapshot["sojourn"].items():
+        lines.append(f"{request_type:<8} {stats['count']:>7} {stats['p50']:>8.3f} {stats['p95']:>8.3f} "
+                     f"{stats['p99']:>8.3f} {stats['p999']:>8.3f}")
+    return "\n".join(lines)
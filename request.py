@@ -0,0 +1,124 @@
+import threading
+from array import array
+from itertools import compress
+
+from event_log import request_name
+
+# Compact request records. A Request is one small fixed-layout object per accepted request: integer id (numbered
+# per type, as in "Read12"), integer type code, and the arrival, start and finish times as they happen. Queues
+# hold Requests instead of (name, type, arrival) tuples, so workers read the type directly rather than parsing it
+# back out of a display name; names are only built when something is displayed.
+# Type codes are small integers shared by the whole process, assigned the first time a type is seen; simulators
+# resolve their codes once up front (type_codes) so the hot path is a dict lookup.
+# RequestLedger keeps finished requests as parallel arrays (about 30 bytes each), for exact per-request latency
+# accounting over millions of requests.
+
+REQUEST_TYPES = []  # Type code -> request type name
+_CODES = {}
+_codes_lock = threading.Lock()
+
+
+def type_code(request_type):
+    code = _CODES.get(request_type)
+    if code is None:
+        with _codes_lock:
+            code = _CODES.get(request_type)
+            if code is None:
+                code = _CODES[request_type] = len(REQUEST_TYPES)
+                REQUEST_TYPES.append(request_type)
+    return code
+
+
+# {request_type: code} for every type a simulator serves
+def type_codes(request_types):
+    return {request_type: type_code(request_type) for request_type in request_types}
+
+
+class Request:
+    __slots__ = ("id", "code", "arrival", "start", "finish")
+
+    def __init__(self, request_id, code, arrival):
+        self.id = request_id
+        self.code = code
+        self.arrival = arrival
+        self.start = None
+        self.finish = None
+
+    @property
+    def type(self):
+        return REQUEST_TYPES[self.code]
+
+    @property
+    def name(self):
+        return request_name(REQUEST_TYPES[self.code], self.id)
+
+    @property
+    def wait(self):
+        return None if self.start is None else self.start - self.arrival
+
+    @property
+    def latency(self):
+        return None if self.finish is None else self.finish - self.arrival
+
+    def __repr__(self):
+        return f"Request({self.name}, arrival={self.arrival}, start={self.start}, finish={self.finish})"
+
+
+# Finished requests as a struct of arrays: ids, type codes and the three timestamps per request
+class RequestLedger:
+    def __init__(self):
+        self.ids = array("Q")
+        self.codes = array("H")
+        self.arrivals = array("d")
+        self.starts = array("d")
+        self.finishes = array("d")
+        self.lock = threading.Lock()  # The threaded demos record from several worker threads
+
+    def record(self, request):
+        with self.lock:
+            self.ids.append(request.id)
+            self.codes.append(request.code)
+            self.arrivals.append(request.arrival)
+            self.starts.append(request.start)
+            self.finishes.append(request.finish)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def latencies(self, request_type=None):
+        # Response times (finish - arrival) in completion order, of every request or of one type
+        latencies = map(float.__sub__, self.finishes, self.arrivals)
+        if request_type is None:
+            return list(latencies)
+        code = type_code(request_type)
+        return list(compress(latencies, (request_code == code for request_code in self.codes)))
+
+    def waits(self, request_type=None):
+        waits = map(float.__sub__, self.starts, self.arrivals)
+        if request_type is None:
+            return list(waits)
+        code = type_code(request_type)
+        return list(compress(waits, (request_code == code for request_code in self.codes)))
+
+    def summary(self):
+        # Exact latency percentiles per request type
+        summary = {}
+        for code in sorted(set(self.codes)):
+            request_type = REQUEST_TYPES[code]
+            latencies = sorted(self.latencies(request_type))
+            count = len(latencies)
+            summary[request_type] = {
+                "count": count,
+                "mean": sum(latencies) / count,
+                "p50": latencies[int(count * 0.50)],
+                "p99": latencies[min(count - 1, int(count * 0.99))],
+                "max": latencies[-1]
+            }
+        return summary
+
+    def write_csv(self, path):
+        with open(path, "w", buffering=1 << 16) as file:
+            file.write("type,id,arrival,start,finish\n")
+            for request_id, code, arrival, start, finish in zip(self.ids, self.codes, self.arrivals, self.starts,
+                                                                 self.finishes):
+                file.write(f"{REQUEST_TYPES[code]},{request_id},{arrival},{start},{finish}\n")
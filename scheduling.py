@@ -0,0 +1,103 @@
+import heapq
+from collections import deque
+from itertools import chain, count
+
+# Scheduling disciplines for the request queue. Every queue stores request.Request records (or subclasses)
+# and exposes the deque interface queue.Queue relies on (append, popleft, len, iteration), so the
+# same classes back the event engine's worker pools and the asyncio simulator.
+# Iteration order is storage order, which is only service order for FIFO.
+
+DISCIPLINES = ("fifo", "priority", "sjf", "fair")
+
+
+# Static priority by request type: lower number is served first, FIFO within a priority
+class StaticPriorityQueue:
+    def __init__(self, priorities):
+        self.priorities = priorities
+        self.heap = []
+        self._order = count()
+
+    def append(self, item):
+        heapq.heappush(self.heap, (self.priorities.get(item.type, 0), next(self._order), item))
+
+    def popleft(self):
+        return heapq.heappop(self.heap)[2]
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __iter__(self):
+        return (entry[2] for entry in self.heap)
+
+
+# Shortest processing time first, using the per-type PROCESS_TIMES
+class ShortestJobFirstQueue(StaticPriorityQueue):
+    def __init__(self, process_times):
+        super().__init__(process_times)
+
+
+# Weighted round-robin across per-type sub-queues: each type gets `weights[type]` consecutive turns
+class WeightedFairQueue:
+    def __init__(self, weights):
+        # A type with no turns would never be served, and popleft would spin waiting for it
+        invalid = {request_type: weight for request_type, weight in weights.items() if not weight > 0}
+        if invalid:
+            raise ValueError(f"Fair queue weights must be positive: {invalid}")
+        self.weights = dict(weights)
+        self.queues = {request_type: deque() for request_type in self.weights}
+        self.order = list(self.queues)
+        self.current = 0
+        self.credit = self.weights[self.order[0]] if self.order else 0
+        self.size = 0
+
+    def append(self, item):
+        request_type = item.type
+        if request_type not in self.queues:
+            self.weights[request_type] = 1
+            self.queues[request_type] = deque()
+            self.order.append(request_type)
+        self.queues[request_type].append(item)
+        self.size += 1
+
+    def popleft(self):
+        if not self.size:
+            raise IndexError("pop from an empty queue")
+        while True:
+            request_type = self.order[self.current]
+            sub_queue = self.queues[request_type]
+            if self.credit > 0 and sub_queue:
+                self.credit -= 1
+                self.size -= 1
+                return sub_queue.popleft()
+            # Turn over (or nothing waiting): move to the next type with a fresh quantum
+            self.current = (self.current + 1) % len(self.order)
+            self.credit = self.weights[self.order[self.current]]
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return chain.from_iterable(self.queues.values())
+
+
+# Build an empty queue for a discipline
+def make_queue(discipline="fifo", process_times=None, priorities=None, weights=None):
+    if discipline == "fifo":
+        return deque()
+    if discipline == "priority":
+        return StaticPriorityQueue(priorities or {})
+    if discipline == "sjf":
+        return ShortestJobFirstQueue(process_times or {})
+    if discipline == "fair":
+        return WeightedFairQueue(weights or dict.fromkeys(process_times or {}, 1))
+    raise ValueError(f"Unknown scheduling discipline: {discipline} (expected one of {', '.join(DISCIPLINES)})")
+
+
+# Scheduling settings from config.json: "discipline", plus "priorities" or "fair_weights" per request type
+def scheduling_options(config, process_times):
+    return {
+        "discipline": config.get("discipline", "fifo"),
+        "process_times": process_times,
+        "priorities": config.get("priorities"),
+        "weights": config.get("fair_weights")
+    }
@@ -0,0 +1,96 @@
+import time
+
+from admission import client_from_config
+from arrivals import arrivals_from_config
+from event_engine import EventEngine, feed_arrivals, simulation_from_config
+from event_log import BLOCK, ENQUEUE, EventLog, request_name
+from metrics import MetricsCollector
+
+# The live server behind the GUI demos (Demo_problem.py and demo_animation.py): a QueueSimulation on an
+# EventEngine whose virtual clock the Tk main loop advances in step with the wall clock. Service is a scheduled
+# completion rather than a sleeping worker thread, so everything runs on the main thread, pausing freezes the
+# clock and `speed` plays the scenario faster or slower than real time. Built from a scenario config:
+#   queue_length, *_time     the bounded queue and per-type service times
+#   workers                  identical workers sharing the queue
+#   worker_groups            optional dedicated workers per request type, e.g. {"read": 4, "write": 2, "forward": 1}
+#   queue_partitions         optional per-type queue bounds for worker groups
+#   discipline, ...          queue scheduling, see scheduling.scheduling_options
+#   admission                overload behaviour beyond drop-on-full, see admission.py
+#   arrivals                 the arrival source, see arrivals.arrivals_from_config (requests_sequence by default)
+#   log_capacity             log entries kept in memory (default 1000)
+#   log_spill_path           optional CSV file receiving the full event history
+
+
+# Most requests that can be waiting at once: partitions may add up to more than queue_length
+def queue_capacity(config):
+    worker_groups, queue_partitions = config.get("worker_groups"), config.get("queue_partitions")
+    if worker_groups and queue_partitions:
+        return sum(queue_partitions.get(request_type, config["queue_length"]) for request_type in worker_groups)
+    return config["queue_length"]
+
+
+# Server class simulating request processing with a limited queue. Driven like trace_file.TraceReplayer:
+# the App calls advance() once per frame with the wall time since the previous one.
+class ServerSimulator:
+    def __init__(self, config, instruments=None, speed=1.0):
+        self.config = config
+        self.engine = EventEngine()
+        self.log = EventLog(config.get("log_capacity", 1000), config.get("log_spill_path"), virtual_time=True)
+        self.simulation = simulation_from_config(self.engine, config, self.log)
+        self.metrics = self.simulation.metrics = MetricsCollector(self.simulation.process_times,
+                                                                  servers=self.simulation.total_workers())
+        self.client = client_from_config(self.simulation, config)  # Optional AdmissionClient: drop, block or retry
+        # Goodput and retry amplification, or None without an "admission" section
+        self.admission = self.client.stats if self.client is not None else None
+        self.instruments = instruments  # Optional instrumentation.Instruments: engine time per frame, request outcomes
+        self.speed = speed  # Simulated seconds per wall-clock second
+        self.playing = False
+        self.fed = False
+        self.shed = 0  # simulation.shed at the last BLOCK, to tell shed requests from blocked ones
+        self.update_queue_display_callback = None  # Called as callback(request_name, request_type, blocked) on arrivals
+        self.simulation.listeners.append(self._listener)
+
+    @property
+    def now(self):
+        return self.engine.now
+
+    def start(self):
+        # Play (or resume) the scenario; the arrival source starts at the virtual time of the first start
+        if not self.fed:
+            self.fed = True
+            add_request = self.client.add_request if self.client is not None else self.simulation.add_request
+            feed_arrivals(self.engine, arrivals_from_config(self.config), add_request)
+        self.playing = True
+
+    def advance(self, wall_elapsed):
+        # Run every event up to the new virtual time; returns how many ran
+        if not self.playing:
+            return 0
+        until = self.engine.now + wall_elapsed * self.speed
+        if self.instruments is None:
+            return self.engine.run(until=until)
+        started = time.perf_counter()
+        processed = self.engine.run(until=until)
+        self.instruments.add_time("engine.advance", time.perf_counter() - started)
+        return processed
+
+    def _listener(self, kind, now, request_id, request_type):
+        if kind != ENQUEUE and kind != BLOCK:
+            return
+        if self.instruments is not None:
+            if kind == ENQUEUE:
+                self.instruments.count("requests.enqueued")
+            else:
+                self.instruments.count("requests.shed" if self.simulation.shed > self.shed else "requests.blocked")
+                self.shed = self.simulation.shed
+        if self.update_queue_display_callback:
+            self.update_queue_display_callback(request_name(request_type, request_id), request_type,
+                                               blocked=(kind == BLOCK))
+
+    def queued_items(self):
+        # Waiting Requests across all worker-group queues, for display
+        return self.simulation.queued_items()
+
+    def stop(self):
+        self.playing = False
+        self.log.close()
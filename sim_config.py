@@ -0,0 +1,17 @@
+import json
+
+# Default scenario file shared by the GUI demos and the headless tools
+DEFAULT_CONFIG_PATH = "config.json"
+
+# Load a scenario from a JSON config file
+def load_config(path=DEFAULT_CONFIG_PATH):
+    with open(path, "r") as file:
+        return json.load(file)
+
+# Map each request type to its processing time, as in PROCESS_TIMES of the demos
+def process_times(config):
+    return {
+        "read": config["read_time"],
+        "write": config["write_time"],
+        "forward": config["forward_time"]
+    }
@@ -0,0 +1,194 @@
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from analytic import mm1k, solve_configs
+from event_engine import run_scenario
+from sim_config import DEFAULT_CONFIG_PATH, load_config
+
+# Parameter sweeps: expand a grid of config.json overrides into scenarios, run them across a process
+# pool, and stream one flat result row per scenario to CSV (or Parquet). Rows are cached on disk keyed
+# by a hash of the scenario and seed, so re-running an overlapping grid only computes the new points.
+# Usage: python sweep.py --grid queue_length=5,10,20 --grid rq_time_arrival=0.5,1,2 --output results.csv
+
+DEFAULT_CACHE_DIR = ".sweep_cache"
+
+
+# One scenario per combination of grid values, e.g. {"queue_length": [5, 10], "read_time": [1, 3]}
+def expand_grid(base_config, grid):
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        config = dict(base_config)
+        config.update(zip(names, values))
+        yield config
+
+
+# Stable cache key of a scenario and seed
+def scenario_key(config, seed):
+    payload = json.dumps({"config": config, "seed": seed}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# Nested metric dicts as flat columns: {"sojourn": {"read": {"p99": 1}}} -> {"sojourn_read_p99": 1}
+def flatten(values, prefix=""):
+    flat = {}
+    for name, value in values.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{name}_"))
+        else:
+            flat[prefix + name] = value
+    return flat
+
+
+# One result row per scenario file under cache_dir/<first two hex digits>/<key>.json
+class ResultCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, row):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(row, file)
+        os.replace(temporary, path)  # Atomic, so a crashed run never leaves a half-written entry
+
+
+# Run one scenario on the event engine; stochastic arrival sources are seeded with `seed`
+def run_point(config, seed=0):
+    config = dict(config)
+    if config.get("arrivals"):
+        config["arrivals"] = dict(config["arrivals"], seed=seed)
+    simulation = run_scenario(config, collect_metrics=True)
+    row = {"source": "simulation"}
+    row.update(simulation.summary())
+    row.update(flatten(simulation.metrics.snapshot(simulation.engine.now)))
+    if simulation.admission is not None:
+        row.update(flatten(simulation.admission.snapshot(), "admission_"))
+    return row
+
+
+def _run_chunk(tasks):
+    return [(key, run_point(config, seed)) for key, config, seed in tasks]
+
+
+# Yield (parameters, row) for every grid point: cached points first, then computed ones as they finish.
+# With analytic=True, points that are exact M/G/1/K instances are answered by the analytic model instead.
+def sweep(base_config, grid, seed=0, workers=None, cache_dir=DEFAULT_CACHE_DIR, analytic=False):
+    cache = ResultCache(cache_dir) if cache_dir else None
+    names = list(grid)
+    configs = list(expand_grid(base_config, grid))
+    solved = solve_configs(configs) if analytic else [None] * len(configs)
+    pending = {}
+    tasks = []
+    for config, exact in zip(configs, solved):
+        parameters = {name: config[name] for name in names}
+        if exact is not None:
+            yield parameters, dict(exact, source="analytic")
+            continue
+        key = scenario_key(config, seed)
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            yield parameters, cached
+        elif key not in pending:
+            pending[key] = parameters
+            tasks.append((key, config, seed))
+    if not tasks:
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Several points per job keeps the per-task overhead small; jobs are reported as they complete
+        chunksize = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+        jobs = [executor.submit(_run_chunk, tasks[first:first + chunksize]) for first in range(0, len(tasks), chunksize)]
+        for job in as_completed(jobs):
+            for key, row in job.result():
+                if cache:
+                    cache.put(key, row)
+                yield pending[key], row
+
+
+# Every column sweep() can yield for this grid, known before any point runs so the CSV header can be written
+# first: the grid parameters, those of each scenario's simulated row (an arrival-free run has the same columns
+# as a full one, for its request types and admission settings) and, with analytic=True, the model's measures
+def sweep_columns(base_config, grid, analytic=False):
+    columns = dict.fromkeys(grid)
+    for config in expand_grid(base_config, grid):
+        columns.update(dict.fromkeys(run_point(dict(config, arrivals=None, requests_sequence=[]))))
+    if analytic:
+        columns.update(dict.fromkeys(["source", *mm1k(1.0, 1.0, 1)]))
+    return list(columns)
+
+
+# Stream sweep rows to a CSV file with the given columns, or collect them into a Parquet file (needs pyarrow)
+def write_results(rows, output, columns):
+    if output.endswith(".parquet"):
+        import pyarrow
+        import pyarrow.parquet
+
+        table = [dict(parameters, **row) for parameters, row in rows]
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(table), output)
+        return len(table)
+    count = 0
+    with open(output, "w", newline="") as file:
+        # Analytic and simulated rows have different columns; values a row does not have stay empty
+        writer = csv.DictWriter(file, fieldnames=columns, restval="")
+        writer.writeheader()
+        for parameters, row in rows:
+            writer.writerow(dict(parameters, **row))
+            file.flush()  # Finished points are on disk while the rest of the sweep runs
+            count += 1
+    return count
+
+
+# "queue_length=5,10,20" -> ("queue_length", [5, 10, 20]); values are parsed as JSON where possible
+def parse_grid_option(option):
+    name, _, values = option.partition("=")
+    parsed = []
+    for value in values.split(","):
+        try:
+            parsed.append(json.loads(value))
+        except ValueError:
+            parsed.append(value)
+    return name, parsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep config.json parameters over a grid.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH)
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="values for one config key; repeat for more keys")
+    parser.add_argument("--grid-file", help="JSON object mapping config keys to value lists")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="result cache directory ('' disables caching)")
+    parser.add_argument("--analytic", action="store_true",
+                        help="answer exact M/G/1/K points (Poisson arrivals, one FIFO worker) analytically")
+    parser.add_argument("--output", default="sweep_results.csv", help=".csv or .parquet")
+    args = parser.parse_args(argv)
+
+    grid = {}
+    if args.grid_file:
+        with open(args.grid_file, "r") as file:
+            grid.update(json.load(file))
+    grid.update(parse_grid_option(option) for option in args.grid)
+    config = load_config(args.config)
+    rows = sweep(config, grid, args.seed, args.workers, args.cache_dir, args.analytic)
+    count = write_results(rows, args.output, sweep_columns(config, grid, args.analytic))
+    print(f"{count} scenarios written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from analytic import mmck, validate
+from arrivals import poisson_arrivals
+from event_engine import EventEngine, QueueSimulation
+from metrics import MetricsCollector
+
+pytest.importorskip("numpy")
+
+SCENARIO = {"queue_length": 4, "read_time": 1, "write_time": 2, "forward_time": 0.5, "rq_time_arrival": 1.3,
+            "requests_sequence": [], "arrivals": {"kind": "poisson", "mix": {"read": 2, "write": 1, "forward": 1}}}
+
+
+# Service times drawn from an exponential distribution; QueueSimulation reads them with process_times.get
+class ExponentialTimes(dict):
+    def __init__(self, rate, seed):
+        super().__init__(job=1.0 / rate)
+        self.rate = rate
+        self.rng = random.Random(seed)
+
+    def get(self, request_type, default=None):
+        return self.rng.expovariate(self.rate)
+
+
+def test_mg1k_matches_event_engine():
+    for name, values in validate(SCENARIO, requests=200000, seed=3).items():
+        assert values["simulated"] == pytest.approx(values["analytic"], rel=0.05, abs=0.005), name
+
+
+@pytest.mark.parametrize("servers, queue_length, arrival_rate", [(1, 3, 0.8), (2, 4, 1.8), (3, 2, 3.5)])
+def test_mmck_matches_event_engine(servers, queue_length, arrival_rate):
+    service_rate = 1.0
+    times = ExponentialTimes(service_rate, seed=servers)
+    engine = EventEngine()
+    metrics = MetricsCollector(times, servers=servers)
+    simulation = QueueSimulation(engine, queue_length, times, workers=servers, metrics=metrics)
+    simulation.feed(poisson_arrivals(arrival_rate, {"job": 1}, count=200000, seed=servers))
+    engine.run()
+    snapshot = metrics.snapshot(engine.now)
+    expected = mmck(arrival_rate, service_rate, servers, queue_length + servers)
+    for name in ("block_rate", "throughput", "utilization", "mean_queue_length", "mean_wait"):
+        assert snapshot[name] == pytest.approx(float(expected[name]), rel=0.05, abs=0.005), name
@@ -0,0 +1,22 @@
+import pytest
+
+from arrivals import arrivals_from_config
+from event_engine import run_scenario
+
+CONFIG = {"queue_length": 5, "read_time": 1, "write_time": 2, "forward_time": 1, "rq_time_arrival": 1,
+          "requests_sequence": ["read", "write"]}
+
+
+@pytest.mark.parametrize("arrivals", [{"kind": "poisson", "rate": 1},
+                                      {"kind": "mmpp", "rates": [1, 2], "holding_times": [5, 5]}])
+def test_batch_runs_reject_sources_that_never_end(arrivals):
+    config = dict(CONFIG, arrivals=arrivals)
+    with pytest.raises(ValueError, match="count"):
+        run_scenario(config)
+    assert next(arrivals_from_config(config))  # A GUI playback may still stream it
+
+
+@pytest.mark.parametrize("limit", [{"count": 50}, {"duration": 20.0}])
+def test_bounded_sources_run_to_completion(limit):
+    simulation = run_scenario(dict(CONFIG, arrivals=dict({"kind": "poisson", "rate": 1, "seed": 1}, **limit)))
+    assert 0 < simulation.arrived <= limit.get("count", 100)
@@ -0,0 +1,21 @@
+import pytest
+
+from async_sim import run_async
+
+CONFIG = {"queue_length": 5, "read_time": 1, "write_time": 2, "forward_time": 0.5, "rq_time_arrival": 0.5,
+          "clients": {"count": 50, "duration": 100, "seed": 1}}
+
+
+@pytest.mark.parametrize("settings", [{"worker_groups": {"read": 1, "write": 1, "forward": 1}},
+                                      {"queue_partitions": {"read": 2, "write": 2, "forward": 2}},
+                                      {"admission": {"client": "retry"}},
+                                      {"admission": {"client": "block", "timeout": 5}}])
+def test_rejects_settings_it_does_not_model(settings):
+    with pytest.raises(ValueError):
+        run_async(dict(CONFIG, **settings))
+
+
+def test_runs_with_a_limiter_and_dropping_clients():
+    simulation = run_async(dict(CONFIG, admission={"client": "drop", "limiter": "token_bucket", "token_rates": {"write": 0.1}}))
+    assert simulation.arrived > 0
+    assert simulation.shed > 0
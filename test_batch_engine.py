@@ -0,0 +1,54 @@
+from statistics import mean, stdev
+
+import pytest
+
+from batch_engine import confidence_intervals, simulate_batch, validate
+from event_engine import run_scenario
+
+np = pytest.importorskip("numpy")
+
+CONFIG = {"queue_length": 3, "read_time": 1, "write_time": 2, "forward_time": 0.5, "rq_time_arrival": 1.4,
+          "requests_sequence": ["read", "read", "write"], "arrivals": {"kind": "poisson"}}
+
+
+def event_engine_runs(config, seeds, requests):
+    block_rates, waits = [], []
+    for seed in seeds:
+        simulation = run_scenario(dict(config, arrivals=dict(config["arrivals"], count=requests, seed=seed)),
+                                  collect_metrics=True)
+        snapshot = simulation.metrics.snapshot(simulation.engine.now)
+        block_rates.append(snapshot["block_rate"])
+        waits.append(snapshot["mean_wait"])
+    return block_rates, waits
+
+
+def test_batch_engine_matches_event_engine():
+    # Independent random streams, same scenario and seeds: the means must agree within sampling error
+    batch = confidence_intervals(simulate_batch(CONFIG, replications=200, requests=2000, seed=1))
+    block_rates, waits = event_engine_runs(CONFIG, range(20), 5000)
+    for name, values in (("block_rate", block_rates), ("mean_wait", waits)):
+        batch_error = (batch[name]["high"] - batch[name]["low"]) / (2 * 1.96)
+        event_error = stdev(values) / len(values) ** 0.5
+        assert abs(batch[name]["mean"] - mean(values)) < 4 * (batch_error ** 2 + event_error ** 2) ** 0.5, name
+
+
+def test_validate_replays_the_same_draws():
+    differences = validate(CONFIG, replications=3, requests=500, seed=2)
+    assert differences["block_rate"] < 1e-12
+    assert differences["mean_wait"] < 1e-9
+
+
+def test_mix_defaults_to_arrivals_from_config_mix():
+    # Without a configured mix both engines draw an even mix, not the requests_sequence frequencies
+    uniform = simulate_batch(dict(CONFIG, arrivals={"kind": "poisson", "mix": {"read": 1, "write": 1, "forward": 1}}),
+                             replications=5, requests=500)
+    default = simulate_batch(CONFIG, replications=5, requests=500)
+    assert np.array_equal(uniform["block_rate"], default["block_rate"])
+
+
+@pytest.mark.parametrize("arrivals", [None, {"kind": "sequence"}, {"kind": "mmpp", "rates": [1, 2], "holding_times": [5, 5]},
+                                      {"kind": "trace", "path": "arrivals.jsonl"}])
+def test_rejects_arrival_sources_other_than_poisson(arrivals):
+    config = dict(CONFIG, arrivals=arrivals)
+    with pytest.raises(ValueError):
+        simulate_batch(config, replications=2, requests=10)
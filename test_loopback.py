@@ -0,0 +1,32 @@
+import asyncio
+
+from async_sim import simulation_from_config
+from loopback import LoopbackServer
+
+CONFIG = {"queue_length": 5, "read_time": 0.2, "write_time": 0.2, "forward_time": 0.2, "rq_time_arrival": 1}
+
+
+def test_server_keeps_serving_after_a_client_hangs_up_mid_request():
+    async def scenario():
+        server = LoopbackServer(simulation_from_config(CONFIG, speed=1.0))
+        await server.start()
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"1 read\n2 read\n")
+            await writer.drain()
+            await asyncio.sleep(0.05)
+            writer.close()
+            await asyncio.sleep(0.5)  # Both requests finish after their client is gone
+
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"3 write\n")
+            await writer.drain()
+            response = await asyncio.wait_for(reader.readline(), 2)
+            writer.close()
+            return response, [task.done() for task in server.simulation.worker_tasks]
+        finally:
+            await server.close()
+
+    response, workers_done = asyncio.run(scenario())
+    assert response == b"3 OK\n"
+    assert not any(workers_done)
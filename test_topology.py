@@ -0,0 +1,34 @@
+import pytest
+
+from arrivals import arrivals_from_config
+from event_engine import EventEngine
+from event_log import FINISH, START
+from topology import Topology
+
+CONFIG = {"queue_length": 5, "read_time": 1, "write_time": 1, "forward_time": 1, "rq_time_arrival": 1,
+          "arrivals": {"kind": "poisson", "rate": 3, "mix": {"forward": 1}, "count": 60, "seed": 1}}
+
+
+@pytest.mark.parametrize("spec", [
+    # One affine node: the balancer has nothing to exclude, so forwards go back to the node that served them
+    {"nodes": [{"name": "a"}, {"name": "b"}], "balancer": "type_affinity", "affinity": {"forward": ["a"]},
+     "forward_hops": 3},
+    {"nodes": [{"name": "a"}, {"name": "b", "workers": 2}], "forward_to": {"a": "a", "b": "a"}, "forward_hops": 2},
+    {"nodes": [{"name": "a"}, {"name": "b"}], "balancer": "least_queue", "forward_to": {"a": "b", "b": "a"}}])
+def test_forwarding_never_oversubscribes_workers(spec):
+    engine = EventEngine()
+    topology = Topology(engine, dict(CONFIG, topology=spec))
+    seen = []
+    for node in topology.nodes:
+        def check(kind, now, request_id, request_type, node=node):
+            if kind in (START, FINISH):
+                seen.append((node.busy, node.total_workers(), min(pool.idle for pool in node.pools.values())))
+        node.listeners.append(check)
+    topology.feed(arrivals_from_config(CONFIG))
+    engine.run()
+
+    assert topology.forwarded > 0
+    assert all(busy <= workers and idle >= 0 for busy, workers, idle in seen)
+    for node in topology.nodes:
+        # Each worker serves at most one one-second request per simulated second
+        assert node.completed <= node.total_workers() * (engine.now + 1)
@@ -0,0 +1,136 @@
+import random
+from itertools import count
+
+from arrivals import arrivals_from_config
+from event_engine import EventEngine, feed_arrivals, simulation_from_config
+from event_log import FINISH
+from metrics import MetricsCollector
+
+# Multi-node topology: a front load balancer spreads arrivals over several QueueSimulation nodes on
+# one event engine, and "forward" requests are re-enqueued at a downstream node after being served.
+# Configured by a "topology" section in config.json, e.g.
+#   "topology": {
+#       "nodes": [{"name": "a"}, {"name": "b", "queue_length": 30, "workers": 2}],
+#       "balancer": "least_queue",
+#       "affinity": {"write": ["b"]},
+#       "forward_to": {"a": "b"},
+#       "forward_hops": 1
+#   }
+# Each node takes queue_length, *_time, workers, worker_groups and discipline from its own entry,
+# falling back to the top-level config.
+
+BALANCERS = ("round_robin", "least_queue", "power_of_two", "type_affinity")
+
+
+# Front load balancer choosing a node for each request
+class LoadBalancer:
+    def __init__(self, nodes, policy="round_robin", affinity=None, seed=None):
+        if policy not in BALANCERS:
+            raise ValueError(f"Unknown balancer policy: {policy} (expected one of {', '.join(BALANCERS)})")
+        self.nodes = nodes
+        self.policy = policy
+        self.affinity = {request_type: [self.node_named(name) for name in names]
+                         for request_type, names in (affinity or {}).items()}
+        self.rng = random.Random(seed)
+        self._next = count()
+
+    def node_named(self, name):
+        for node in self.nodes:
+            if node.name == name:
+                return node
+        raise ValueError(f"Unknown node in topology: {name}")
+
+    def choose(self, request_type, exclude=None):
+        candidates = self.nodes
+        if self.policy == "type_affinity":
+            candidates = self.affinity.get(request_type, candidates)
+        if exclude is not None and len(candidates) > 1:
+            candidates = [node for node in candidates if node is not exclude]
+        if self.policy == "round_robin":
+            return candidates[next(self._next) % len(candidates)]
+        if self.policy == "power_of_two" and len(candidates) > 2:
+            candidates = self.rng.sample(candidates, 2)
+        # least_queue, type_affinity within the affine nodes, and the better of the two sampled nodes
+        return min(candidates, key=_outstanding)
+
+
+def _outstanding(node):
+    return node.queued + node.busy
+
+
+# The nodes, the balancer and the forwarding rules, all driven by one EventEngine
+class Topology:
+    def __init__(self, engine, config, collect_metrics=False):
+        spec = config["topology"]
+        self.engine = engine
+        self.nodes = []
+        for index, node_spec in enumerate(spec["nodes"]):
+            node_config = dict(config)
+            node_config.update(node_spec)
+            node = simulation_from_config(engine, node_config)
+            node.name = node_spec.get("name", f"node{index + 1}")
+            if collect_metrics:
+                node.metrics = MetricsCollector(node.process_times, servers=node.total_workers())
+            node.listeners.append(self._forwarding_listener(node))
+            self.nodes.append(node)
+        self.balancer = LoadBalancer(self.nodes, spec.get("balancer", "round_robin"), spec.get("affinity"),
+                                     spec.get("seed"))
+        self.forward_to = {name: self.balancer.node_named(target) for name, target in spec.get("forward_to", {}).items()}
+        self.forward_hops = spec.get("forward_hops", 1)
+        self.hops = {}  # (node name, request id) -> hops taken, for forwarded requests still in a node
+        self.forwarded = 0
+        self.forward_blocked = 0
+
+    def add_request(self, request_type):
+        self.balancer.choose(request_type).add_request(request_type)
+
+    def feed(self, arrivals):
+        feed_arrivals(self.engine, arrivals, self.add_request)
+
+    def _forwarding_listener(self, node):
+        # When a "forward" finishes, pass it on to the downstream node until forward_hops is used up.
+        # Listeners run inside the node's _finish, before it restarts its own workers, so the hand-off is a
+        # separate event: a node forwarding to itself would otherwise start two requests on one free worker.
+        def listener(kind, now, request_id, request_type):
+            if kind != FINISH or request_type != "forward":
+                return
+            hops = self.hops.pop((node.name, request_id), 0)
+            if hops >= self.forward_hops or len(self.nodes) < 2:
+                return
+            self.engine.schedule(0, self._forward, node, request_type, hops)
+
+        return listener
+
+    def _forward(self, node, request_type, hops):
+        target = self.forward_to.get(node.name) or self.balancer.choose(request_type, exclude=node)
+        blocked = target.blocked
+        target.add_request(request_type)
+        self.forwarded += 1
+        if target.blocked > blocked:
+            self.forward_blocked += 1
+        else:
+            self.hops[(target.name, target.request_counts[request_type])] = hops + 1
+
+    def summary(self):
+        nodes = {node.name: node.summary() for node in self.nodes}
+        arrived = sum(summary["arrived"] for summary in nodes.values()) - self.forwarded
+        blocked = sum(summary["blocked"] for summary in nodes.values())
+        return {
+            "sim_time": self.engine.now,
+            "events": self.engine.events_processed,
+            "arrived": arrived,
+            "forwarded": self.forwarded,
+            "forward_blocked": self.forward_blocked,
+            "blocked": blocked,
+            "block_rate": blocked / (arrived + self.forwarded) if arrived + self.forwarded else 0.0,
+            "nodes": nodes
+        }
+
+
+# Build and run a topology scenario on the virtual clock
+def run_topology(config, collect_metrics=False):
+    engine = EventEngine()
+    topology = Topology(engine, config, collect_metrics)
+    topology.feed(arrivals_from_config(config, bounded=True))
+    engine.run()
+    return topology
@@ -0,0 +1,213 @@
+import json
+import mmap
+import struct
+from bisect import bisect_right
+
+from event_log import BLOCK, ENQUEUE, FINISH, START, EventLog, request_name
+from metrics import MetricsCollector
+from request import Request, type_code
+
+# Compact binary event traces. A trace is a small JSON header followed by fixed-width records
+# (time, kind, request type code, request id, queued after the event, busy workers after the event).
+# Readers memory-map the file and keep a sparse time index of every INDEX_STRIDE-th record, so
+# multi-gigabyte traces can be scrubbed without loading them into RAM.
+
+MAGIC = b"SQTR"
+VERSION = 1
+PREAMBLE = struct.Struct("<4sHI")  # magic, version, header length
+RECORD = struct.Struct("<dBBIIH")
+TIME = struct.Struct("<d")
+INDEX_STRIDE = 4096
+
+ARRIVAL = "arrival"
+KINDS = (ARRIVAL, ENQUEUE, BLOCK, START, FINISH)
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+ARRIVAL_CODE, ENQUEUE_CODE, BLOCK_CODE, START_CODE, FINISH_CODE = range(len(KINDS))
+
+
+# Simulation listener that appends every event to a trace file
+class TraceWriter:
+    def __init__(self, path, simulation):
+        self.simulation = simulation
+        self.type_codes = {request_type: code for code, request_type in enumerate(simulation.process_times)}
+        header = json.dumps({"types": list(self.type_codes), "servers": simulation.total_workers()}).encode()
+        self.file = open(path, "wb", buffering=1 << 20)
+        self.file.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        self.file.write(header)
+        self.count = 0
+
+    def __call__(self, kind, now, request_id, request_type):
+        simulation = self.simulation
+        code = self.type_codes[request_type]
+        queued = simulation.queued
+        busy = simulation.busy
+        write = self.file.write
+        pack = RECORD.pack
+        if kind == ENQUEUE:
+            # The arrival itself happened just before the request joined the queue
+            write(pack(now, ARRIVAL_CODE, code, request_id, queued - 1, busy))
+            write(pack(now, ENQUEUE_CODE, code, request_id, queued, busy))
+            self.count += 2
+            return
+        if kind == BLOCK:
+            write(pack(now, ARRIVAL_CODE, code, request_id, queued, busy))
+        write(pack(now, KIND_CODES[kind], code, request_id, queued, busy))
+        self.count += 2 if kind == BLOCK else 1
+
+    def close(self):
+        self.file.close()
+
+
+# Random access to a trace through a memory map
+class TraceReader:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_length = PREAMBLE.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} simulator trace")
+        header = json.loads(self.map[PREAMBLE.size:PREAMBLE.size + header_length])
+        self.types = header["types"]
+        self.servers = header.get("servers", 1)
+        self.offset = PREAMBLE.size + header_length
+        self.count = (len(self.map) - self.offset) // RECORD.size
+        self.index = [self.time_at(i) for i in range(0, self.count, INDEX_STRIDE)]
+
+    def __len__(self):
+        return self.count
+
+    def record(self, i):
+        # (time, kind code, type code, request id, queued, busy)
+        return RECORD.unpack_from(self.map, self.offset + i * RECORD.size)
+
+    def time_at(self, i):
+        return TIME.unpack_from(self.map, self.offset + i * RECORD.size)[0]
+
+    def start_time(self):
+        return self.time_at(0) if self.count else 0.0
+
+    def end_time(self):
+        return self.time_at(self.count - 1) if self.count else 0.0
+
+    def position(self, when):
+        # Index of the first record later than `when`: the sparse index narrows it to one stride
+        block = bisect_right(self.index, when)
+        low = max(0, (block - 1) * INDEX_STRIDE)
+        high = min(self.count, block * INDEX_STRIDE)
+        while low < high:
+            middle = (low + high) // 2
+            if self.time_at(middle) <= when:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def records(self, start=0, stop=None):
+        stop = self.count if stop is None else min(stop, self.count)
+        for i in range(start, stop):
+            yield RECORD.unpack_from(self.map, self.offset + i * RECORD.size)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+# Plays a trace back on a clock that can be paused, sped up or moved to any time. It exposes the
+# same queued_items / log / metrics surface as ServerSimulator, so the GUI can display it unchanged.
+class TraceReplayer:
+    def __init__(self, reader, log_capacity=1000):
+        self.reader = reader
+        self.types = reader.types
+        self.request_codes = [type_code(request_type) for request_type in reader.types]  # Trace code -> Request code
+        self.log_capacity = log_capacity
+        self.playing = False
+        self.speed = 1.0
+        self.update_queue_display_callback = None  # Called as callback(request_name, request_type, blocked) on arrivals
+        self.seek(reader.start_time())
+
+    def advance(self, wall_elapsed):
+        # Apply every record up to the new replay time
+        if not self.playing:
+            return 0
+        self.now += wall_elapsed * self.speed
+        stop = self.reader.position(self.now)
+        applied = stop - self.position
+        for record in self.reader.records(self.position, stop):
+            self._apply(record)
+        self.position = stop
+        if stop >= len(self.reader):
+            self.playing = False
+        return applied
+
+    def _apply(self, record):
+        when, kind, code, request_id, _, _ = record
+        request_type = self.types[code]
+        key = (code, request_id)
+        metrics = self.metrics
+        if kind == ARRIVAL_CODE:
+            metrics.on_arrival(when, request_type)
+            return
+        if kind == ENQUEUE_CODE:
+            self.waiting[key] = Request(request_id, self.request_codes[code], when)
+            metrics.on_enqueue(when, request_type)
+            self.log.append(ENQUEUE, request_id, request_type, when)
+        elif kind == BLOCK_CODE:
+            metrics.on_block(when, request_type)
+            self.log.append(BLOCK, request_id, request_type, when)
+        elif kind == START_CODE:
+            arrival_time = self.waiting.pop(key).arrival
+            self.in_service[key] = arrival_time
+            metrics.on_start(when, request_type, when - arrival_time)
+            self.log.append(START, request_id, request_type, when)
+        else:
+            metrics.on_finish(when, request_type, when - self.in_service.pop(key))
+            self.log.append(FINISH, request_id, request_type, when)
+        if kind in (ENQUEUE_CODE, BLOCK_CODE) and self.update_queue_display_callback:
+            self.update_queue_display_callback(request_name(request_type, request_id), request_type,
+                                               blocked=(kind == BLOCK_CODE))
+
+    def seek(self, when):
+        # Jump to a replay time: rebuild the queue from the records just before it, then restart log and metrics
+        self.now = when
+        self.position = self.reader.position(when)
+        self.waiting, self.in_service = self._state_before(self.position)
+        self.log = EventLog(self.log_capacity, virtual_time=True)
+        self.metrics = MetricsCollector(self.types, self.reader.servers, start_time=when)
+        self.metrics.queued = len(self.waiting)
+        self.metrics.busy = len(self.in_service)
+
+    def _state_before(self, position):
+        # Walk backwards only as far as needed to find the requests waiting and in service at `position`
+        if position == 0:
+            return {}, {}
+        _, _, _, _, queued, busy = self.reader.record(position - 1)
+        started = set()
+        finished = set()
+        waiting = []
+        in_service = {}
+        arrivals = {}
+        i = position - 1
+        while i >= 0 and (len(waiting) < queued or len(in_service) < busy or len(arrivals) < len(in_service)):
+            when, kind, code, request_id, _, _ = self.reader.record(i)
+            key = (code, request_id)
+            if kind == FINISH_CODE:
+                finished.add(key)
+            elif kind == START_CODE:
+                started.add(key)
+                if key not in finished:
+                    in_service[key] = None
+            elif kind == ENQUEUE_CODE:
+                if key in in_service:
+                    arrivals[key] = when
+                elif key not in started:
+                    waiting.append((key, Request(request_id, self.request_codes[code], when)))
+            i -= 1
+        waiting.reverse()
+        return dict(waiting), {key: arrivals.get(key, self.now) for key in in_service}
+
+    def queued_items(self):
+        return list(self.waiting.values())
+
+    def stop(self):
+        self.playing = False
+        self.reader.close()